@@ -7,13 +7,17 @@ supplementary data: per-file stats and context clues (comments,
 docstrings) that help the LLM infer goals for unmatched changes.
 """
 
+import copy
+import functools
+import os
 import re
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
+from typing import Optional
 
 from unidiff import PatchSet
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ChangedFile:
     """Per-file change statistics."""
     path: str
@@ -22,7 +26,7 @@ class ChangedFile:
     lines_removed: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ContextClue:
     """Comments and docstrings extracted from added lines in a file."""
     file: str
@@ -30,17 +34,94 @@ class ContextClue:
     docstrings: list[str] = field(default_factory=list)
 
 
-# Regex patterns for single-line comments across common languages
-# Matches: # comment, // comment, -- comment (SQL/Lua/Haskell)
-_COMMENT_PATTERN = re.compile(r'^\s*(?:#|//|--)\s*(.+)')
+# Number of recent analysis results kept, keyed on the diff text and file paths
+ANALYSIS_CACHE_SIZE = 8
 
-# Regex for Python/JS docstring boundaries
-_PY_DOCSTRING_OPEN = re.compile(r'^\s*(?:"""|\'\'\')\s*(.*)')
+# Number of per-file analysis results kept, keyed on that file's section of the diff
+FILE_ANALYSIS_CACHE_SIZE = 256
+
+# Start of each file's section in a git diff
+_FILE_HEADER_PATTERN = re.compile(r'^diff --git ', re.MULTILINE)
+
+
+def _build_line_classifier(
+    comment_markers: tuple[str, ...],
+    py_docstrings: bool = False,
+    js_docstrings: bool = False,
+) -> re.Pattern:
+    """Build a regex classifying an added line by the construct it starts with.
+
+    Match groups (match.lastgroup names the kind):
+    - comment: text after one of the comment markers
+    - py_open: text after a Python triple-quote docstring opener
+    - js_open: text after a JS/TS /** docstring opener
+
+    Args:
+        comment_markers: Single-line comment prefixes, e.g. ('#',)
+        py_docstrings: Whether to recognize triple-quote docstring openers
+        js_docstrings: Whether to recognize /** docstring openers
+
+    Returns:
+        Compiled pattern to call .match() on each line
+    """
+    markers = '|'.join(re.escape(marker) for marker in comment_markers)
+    alternatives = [rf'(?:{markers})\s*(?P<comment>.+)']
+    if py_docstrings:
+        alternatives.append(r'(?:"""|\'\'\')\s*(?P<py_open>.*)')
+    if js_docstrings:
+        alternatives.append(r'/\*\*\s*(?P<js_open>.*)')
+    return re.compile(r'^\s*(?:' + '|'.join(alternatives) + ')')
+
+
+# Classifier for files of unknown type: # comment, // comment, -- comment
+# (SQL/Lua/Haskell), Python triple-quote and JS/TS /** docstring openers
+_LINE_CLASSIFIER = _build_line_classifier(('#', '//', '--'), py_docstrings=True, js_docstrings=True)
+
+# Narrower classifiers for well-known file types, keyed on lowercase extension.
+# Fewer alternatives per line, and no false positives from other languages'
+# syntax (e.g. a JS private field `#count = 0` read as a comment).
+_PY_CLASSIFIER = _build_line_classifier(('#',), py_docstrings=True)
+_C_STYLE_CLASSIFIER = _build_line_classifier(('//',), js_docstrings=True)
+_HASH_CLASSIFIER = _build_line_classifier(('#',))
+_DASH_CLASSIFIER = _build_line_classifier(('--',))
+_LINE_CLASSIFIERS_BY_EXTENSION = {
+    **dict.fromkeys(('.py', '.pyi'), _PY_CLASSIFIER),
+    **dict.fromkeys(
+        ('.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.java', '.kt', '.go',
+         '.rs', '.c', '.h', '.cc', '.cpp', '.hpp', '.cs', '.swift'),
+        _C_STYLE_CLASSIFIER,
+    ),
+    **dict.fromkeys(('.sh', '.bash', '.zsh', '.rb', '.yaml', '.yml', '.toml'), _HASH_CLASSIFIER),
+    **dict.fromkeys(('.sql', '.lua', '.hs'), _DASH_CLASSIFIER),
+}
+
+# Tool directives that aren't meaningful context, matched case-insensitively as
+# substrings (plain `in` checks are several times faster than a regex alternation)
+_NOISE_COMMENT_TOKENS = ('pragma', 'noqa', 'type: ignore', 'type:ignore', 'fmt: off', 'fmt: on')
+
+# Regex for Python/JS docstring closing boundaries
 _PY_DOCSTRING_CLOSE = re.compile(r'(.*?)(?:"""|\'\'\')')
-_JS_DOCSTRING_OPEN = re.compile(r'^\s*/\*\*\s*(.*)')
 _JS_DOCSTRING_CLOSE = re.compile(r'(.*?)\*/')
 
 
+def _parse_patch(diff_text: str) -> Optional[PatchSet]:
+    """Parse a unified diff into a PatchSet.
+
+    Args:
+        diff_text: Raw unified diff text (from git diff).
+
+    Returns:
+        The parsed PatchSet, or None if the diff is empty or unparseable.
+    """
+    if not diff_text or diff_text.isspace():
+        return None
+
+    try:
+        return PatchSet(diff_text)
+    except Exception:
+        return None
+
+
 def parse_diff_stats(diff_text: str) -> list[ChangedFile]:
     """Parse a unified diff into per-file change statistics.
 
@@ -50,14 +131,21 @@ def parse_diff_stats(diff_text: str) -> list[ChangedFile]:
     Returns:
         List of ChangedFile with path, status, and line counts.
     """
-    if not diff_text or not diff_text.strip():
+    patch = _parse_patch(diff_text)
+    if patch is None:
         return []
+    return _diff_stats_from_patch(patch)
 
-    try:
-        patch = PatchSet(diff_text)
-    except Exception:
-        return []
 
+def _diff_stats_from_patch(patch: PatchSet) -> list[ChangedFile]:
+    """Build per-file change statistics from an already-parsed diff.
+
+    Args:
+        patch: Parsed unified diff.
+
+    Returns:
+        List of ChangedFile with path, status, and line counts.
+    """
     results = []
     for patched_file in patch:
         # Determine status
@@ -93,14 +181,21 @@ def extract_context_clues(diff_text: str) -> list[ContextClue]:
     Returns:
         List of ContextClue per file with extracted comments and docstrings.
     """
-    if not diff_text or not diff_text.strip():
+    patch = _parse_patch(diff_text)
+    if patch is None:
         return []
+    return _context_clues_from_patch(patch)
 
-    try:
-        patch = PatchSet(diff_text)
-    except Exception:
-        return []
 
+def _context_clues_from_patch(patch: PatchSet) -> list[ContextClue]:
+    """Extract comments and docstrings from added lines of an already-parsed diff.
+
+    Args:
+        patch: Parsed unified diff.
+
+    Returns:
+        List of ContextClue per file with extracted comments and docstrings.
+    """
     results = []
 
     for patched_file in patch:
@@ -115,23 +210,17 @@ def extract_context_clues(diff_text: str) -> list[ContextClue]:
         for hunk in patched_file:
             for line in hunk:
                 if line.is_added:
-                    added_lines.append(line.value.rstrip('\n'))
-
-        # Extract single-line comments
-        for line_text in added_lines:
-            match = _COMMENT_PATTERN.match(line_text)
-            if match:
-                comment = match.group(1).strip()
-                # Filter out noise: very short comments, shebangs, pragma
-                if (len(comment) > 3
-                        and not comment.startswith('!')
-                        and 'pragma' not in comment.lower()
-                        and 'noqa' not in comment.lower()
-                        and 'type: ignore' not in comment.lower()):
-                    comments.append(comment)
-
-        # Extract docstrings (Python triple-quote and JS /** */ style)
-        _extract_docstrings(added_lines, docstrings)
+                    # unidiff keeps at most one trailing newline; slice it off
+                    # rather than scanning with rstrip()
+                    value = line.value
+                    added_lines.append(value[:-1] if value[-1:] == '\n' else value)
+
+        # Comments and docstrings are collected in a single pass over the lines,
+        # using the comment syntax of the file's language where it's known
+        classifier = _LINE_CLASSIFIERS_BY_EXTENSION.get(
+            os.path.splitext(patched_file.path)[1].lower(), _LINE_CLASSIFIER
+        )
+        _extract_comments_and_docstrings(added_lines, comments, docstrings, classifier)
 
         if comments or docstrings:
             results.append(ContextClue(
@@ -143,23 +232,73 @@ def extract_context_clues(diff_text: str) -> list[ContextClue]:
     return results
 
 
-def _extract_docstrings(lines: list[str], docstrings: list[str]) -> None:
-    """Extract docstrings from a list of source lines.
+def _extract_comments_and_docstrings(
+    lines: list[str],
+    comments: list[str],
+    docstrings: list[str],
+    classifier: re.Pattern = _LINE_CLASSIFIER,
+) -> None:
+    """Extract comments and docstrings from a list of source lines in one pass.
 
-    Handles Python triple-quote strings and JS/TS /** */ blocks.
-    Modifies the docstrings list in place.
+    Handles single-line comments (#, //, --), Python triple-quote strings and
+    JS/TS /** */ blocks. Each line is classified once; while inside a docstring
+    the line is checked for the closing delimiter instead of an opener.
+    Modifies the comments and docstrings lists in place.
 
     Args:
         lines: Source code lines to scan.
+        comments: List to append extracted comment text to.
         docstrings: List to append extracted docstring text to.
+        classifier: Line classifier for the file's language (see
+            _build_line_classifier).
     """
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+    # Open docstring: 'py' or 'js' while collecting its lines, else None
+    in_docstring = None
+    doc_lines = []
+
+    for line in lines:
+        match = classifier.match(line)
+        kind = match.lastgroup if match else None
+
+        if kind == 'comment':
+            comment = match.group('comment').strip()
+            # Filter out noise: very short comments, shebangs, pragma
+            if (len(comment) > 3
+                    and not comment.startswith('!')
+                    and not _is_noise_comment(comment)):
+                comments.append(comment)
+
+        # Inside a Python docstring: look for the closing triple quote
+        if in_docstring == 'py':
+            close_match = None
+            if '"""' in line or "'''" in line:
+                close_match = _PY_DOCSTRING_CLOSE.match(line)
+            if close_match:
+                doc_lines.append(close_match.group(1))
+                _append_docstring(docstrings, doc_lines)
+                in_docstring = None
+            else:
+                doc_lines.append(line.strip())
+            continue
+
+        # Inside a JS/TS /** */ docstring: look for the closing */
+        if in_docstring == 'js':
+            close_match = None
+            if '*/' in line:
+                close_match = _JS_DOCSTRING_CLOSE.match(line)
+            if close_match:
+                doc_lines.append(close_match.group(1).strip().lstrip('* '))
+                _append_docstring(docstrings, doc_lines)
+                in_docstring = None
+            else:
+                # Strip leading * from JSDoc lines
+                stripped = line.strip().lstrip('* ')
+                if stripped:
+                    doc_lines.append(stripped)
+            continue
 
         # Check for Python triple-quote docstring
-        py_match = _PY_DOCSTRING_OPEN.match(line)
-        if py_match:
+        if kind == 'py_open':
             # Check if it's a single-line docstring (opens and closes on same line)
             # Count triple-quote occurrences
             triple_double = line.count('"""')
@@ -174,47 +313,47 @@ def _extract_docstrings(lines: list[str], docstrings: list[str]) -> None:
                         if text and len(text) > 3:
                             docstrings.append(text)
                         break
-                i += 1
-                continue
-
-            # Multi-line docstring
-            doc_lines = [py_match.group(1)]
-            i += 1
-            while i < len(lines):
-                close_match = _PY_DOCSTRING_CLOSE.match(lines[i])
-                if close_match:
-                    doc_lines.append(close_match.group(1))
-                    break
-                doc_lines.append(lines[i].strip())
-                i += 1
-            text = ' '.join(part.strip() for part in doc_lines if part.strip())
-            if text and len(text) > 3:
-                docstrings.append(text)
-            i += 1
-            continue
+            else:
+                # Multi-line docstring
+                in_docstring = 'py'
+                doc_lines = [match.group('py_open')]
 
         # Check for JS/TS /** */ docstring
-        js_match = _JS_DOCSTRING_OPEN.match(line)
-        if js_match:
-            doc_lines = [js_match.group(1)]
-            i += 1
-            while i < len(lines):
-                close_match = _JS_DOCSTRING_CLOSE.match(lines[i])
-                if close_match:
-                    doc_lines.append(close_match.group(1).strip().lstrip('* '))
-                    break
-                # Strip leading * from JSDoc lines
-                stripped = lines[i].strip().lstrip('* ')
-                if stripped:
-                    doc_lines.append(stripped)
-                i += 1
-            text = ' '.join(part.strip() for part in doc_lines if part.strip())
-            if text and len(text) > 3:
-                docstrings.append(text)
-            i += 1
-            continue
+        elif kind == 'js_open':
+            in_docstring = 'js'
+            doc_lines = [match.group('js_open')]
+
+    # A docstring still open at the end of the added lines is kept as-is
+    if in_docstring is not None:
+        _append_docstring(docstrings, doc_lines)
 
-        i += 1
+
+def _is_noise_comment(comment: str) -> bool:
+    """Check whether a comment is a tool directive rather than context.
+
+    Args:
+        comment: Comment text without its marker.
+
+    Returns:
+        True if the comment contains one of _NOISE_COMMENT_TOKENS.
+    """
+    lowered = comment.lower()
+    for token in _NOISE_COMMENT_TOKENS:
+        if token in lowered:
+            return True
+    return False
+
+
+def _append_docstring(docstrings: list[str], doc_lines: list[str]) -> None:
+    """Join collected docstring lines and keep the text if it's meaningful.
+
+    Args:
+        docstrings: List to append the docstring text to.
+        doc_lines: Raw docstring lines, without delimiters.
+    """
+    text = ' '.join(part.strip() for part in doc_lines if part.strip())
+    if text and len(text) > 3:
+        docstrings.append(text)
 
 
 def analyze_changes(diff_text: str, file_stats: list[dict]) -> dict:
@@ -234,46 +373,118 @@ def analyze_changes(diff_text: str, file_stats: list[dict]) -> dict:
     Returns:
         Dict with summary and context_clues, ready for JSON serialization.
     """
-    # Parse diff for per-file line counts
-    diff_stats = parse_diff_stats(diff_text)
+    # File stats arrive as a list of dicts; only their paths are used, so key on those
+    paths_key = tuple(f['path'] for f in file_stats)
+    # Copy so callers can't mutate the cached result
+    return copy.deepcopy(_analyze_changes_cached(diff_text, paths_key))
 
-    # Build summary
-    total_added = sum(f.lines_added for f in diff_stats)
-    total_removed = sum(f.lines_removed for f in diff_stats)
 
-    files_by_status = {}
+def _split_file_sections(diff_text: str) -> list[str]:
+    """Split a git diff into one section per file, at each 'diff --git' header.
+
+    Args:
+        diff_text: Raw unified diff text.
+
+    Returns:
+        List of diff sections, empty for a blank diff; text before the first
+        header (or a diff without any headers) is kept as a section of its own.
+    """
+    # Untracked-only reviews pass an empty diff: nothing to parse or cache
+    if not diff_text or diff_text.isspace():
+        return []
+
+    starts = [match.start() for match in _FILE_HEADER_PATTERN.finditer(diff_text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(diff_text))
+    return [diff_text[start:end] for start, end in zip(starts, starts[1:])]
+
+
+@functools.lru_cache(maxsize=FILE_ANALYSIS_CACHE_SIZE)
+def _analyze_file_section(section: str) -> tuple[tuple[ChangedFile, ...], tuple[ContextClue, ...]]:
+    """Parse one file's diff section into stats and context clues, memoized on its text.
+
+    The section text embeds the file's blob hashes and hunks, so an unchanged
+    file hits the cache even when other files in the diff have changed.
+    Callers must not mutate the returned clues.
+
+    Args:
+        section: Diff text for a single file.
+
+    Returns:
+        Tuple of (ChangedFile entries, ContextClue entries); both are empty if
+        the section doesn't parse.
+    """
+    # Parse once and share it between stats and context clue extraction
+    patch = _parse_patch(section)
+    if patch is None:
+        return (), ()
+    return tuple(_diff_stats_from_patch(patch)), tuple(_context_clues_from_patch(patch))
+
+
+@functools.lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze_changes_cached(diff_text: str, file_paths: tuple[str, ...]) -> dict:
+    """Analyze changes, memoized on the diff text and file stat paths.
+
+    Repeated review_changes calls on an unchanged tree hit the cache instead
+    of re-parsing the diff. See analyze_changes() for arguments and result.
+    Callers must not mutate the returned dict.
+    """
+    # Analyze file by file so that when one file changes between calls, only
+    # its section of the diff is parsed again
+    diff_stats = []
+    clues = []
+    for section in _split_file_sections(diff_text):
+        section_stats, section_clues = _analyze_file_section(section)
+        diff_stats.extend(section_stats)
+        clues.extend(section_clues)
+
+    # Build summary, per-file changes and the set of diff paths in one pass
+    total_added = 0
+    total_removed = 0
+    files_by_status = {'added': 0, 'modified': 0, 'deleted': 0, 'renamed': 0}
+    diff_paths = set()
+    changes = []
     for f in diff_stats:
-        files_by_status[f.status] = files_by_status.get(f.status, 0) + 1
+        total_added += f.lines_added
+        total_removed += f.lines_removed
+        files_by_status[f.status] += 1
+        diff_paths.add(f.path)
+        changes.append({
+            'path': f.path,
+            'status': f.status,
+            'lines_added': f.lines_added,
+            'lines_removed': f.lines_removed,
+        })
 
     # Include untracked files from file_stats that aren't in the diff
-    diff_paths = {f.path for f in diff_stats}
-    untracked = [f for f in file_stats if f['path'] not in diff_paths]
-    if untracked:
-        files_by_status['added'] = files_by_status.get('added', 0) + len(untracked)
+    untracked = [path for path in file_paths if path not in diff_paths]
+    files_by_status['added'] += len(untracked)
 
     summary = {
         'total_files': len(diff_stats) + len(untracked),
-        'files_added': files_by_status.get('added', 0),
-        'files_modified': files_by_status.get('modified', 0),
-        'files_deleted': files_by_status.get('deleted', 0),
-        'files_renamed': files_by_status.get('renamed', 0),
+        'files_added': files_by_status['added'],
+        'files_modified': files_by_status['modified'],
+        'files_deleted': files_by_status['deleted'],
+        'files_renamed': files_by_status['renamed'],
         'total_lines_added': total_added,
         'total_lines_removed': total_removed,
     }
 
-    # Per-file stats with line counts
-    changes = [asdict(f) for f in diff_stats]
     # Add untracked files (no line counts available from diff)
-    for f in untracked:
+    for path in untracked:
         changes.append({
-            'path': f['path'],
+            'path': path,
             'status': 'added',
             'lines_added': 0,
             'lines_removed': 0,
         })
 
-    # Extract context clues
-    context_clues = [asdict(c) for c in extract_context_clues(diff_text)]
+    # Serialize context clues (dict literals avoid asdict()'s recursive deep copy)
+    context_clues = [
+        {'file': c.file, 'comments': c.comments, 'docstrings': c.docstrings}
+        for c in clues
+    ]
 
     return {
         'summary': summary,
@@ -38,7 +38,8 @@ DEFAULTS: dict[str, Any] = {
 
         # Maximum number of secret findings returned per scan.
         # Prevents flooding the MCP response when a diff has many issues.
-        # Findings beyond this cap are still counted in total_findings.
+        # Scanning stops once this many findings are collected; the result is then
+        # marked truncated and total_findings is a lower bound.
         "max_findings": 20,
 
         # Additional regex patterns to scan for, beyond the 25+ built-in detectors.
@@ -51,6 +52,21 @@ DEFAULTS: dict[str, Any] = {
         #   name = "Internal API Key"
         #   pattern = "MYCO-[A-Za-z0-9]{32}"
         "custom_patterns": [],
+
+        # Regexes for diff paths that are not scanned (searched in the path, so
+        # anchor with ^ for repo-root directories). Matching files are listed
+        # under skipped_files and the scan is never reported as plain "clean".
+        # Defaults cover vendored dependencies, lockfiles and minified bundles,
+        # which are third-party or generated, slow to scan and full of
+        # high-entropy hashes (false positives); set to [] to scan every file.
+        # The secret scanner's DEFAULT_SKIP_PATHS is taken from this list.
+        "skip_paths": [
+            r"(?:^|/)node_modules/",
+            r"^(?:vendor|dist)/",
+            r"\.min\.(?:js|css)$",
+            r"\.lock$",
+            r"(?:^|/)(?:package-lock\.json|pnpm-lock\.yaml|go\.sum)$",
+        ],
     },
     "pr": {
         # Branch to compare against when generating PR descriptions.
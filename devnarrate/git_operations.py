@@ -1,13 +1,34 @@
 """Git operations for DevNarrate."""
 
+import bisect
+import functools
+import os
+import re
 import subprocess
-from typing import Optional
+from typing import Callable, Optional
 
 import tiktoken
 
 # MCP response token limit is 25,000 - we'll use 20,000 to be safe
 MAX_RESPONSE_TOKENS = 20000
 
+# Number of recent diffs whose line offsets and token counts are kept for pagination
+DIFF_CACHE_SIZE = 8
+
+# Diffs longer than this (in characters) get their total token count extrapolated
+# from a prefix of this size instead of running BPE over the whole diff
+TOKEN_SAMPLE_CHARS = 256 * 1024
+
+# A page whose verified token count is below this fraction of the budget is grown,
+# re-counting at most MAX_PAGE_GROW_ATTEMPTS times
+PAGE_FILL_TARGET = 0.95
+MAX_PAGE_GROW_ATTEMPTS = 4
+
+# Number of repositories whose git dirs, current branch and platform are kept
+REPO_CACHE_SIZE = 32
+
+_NEWLINE_PATTERN = re.compile('\n')
+
 # Default PR template
 DEFAULT_PR_TEMPLATE = """## Summary
 [Brief description of what this PR does and why]
@@ -24,6 +45,19 @@ DEFAULT_PR_TEMPLATE = """## Summary
 """
 
 
+@functools.lru_cache(maxsize=1)
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    """Load the cl100k_base encoding once and reuse it for the process lifetime.
+
+    Returns:
+        The tiktoken encoding, or None if it could not be loaded
+    """
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
 def count_tokens(text: str) -> int:
     """Count tokens in text using tiktoken (cl100k_base encoding).
 
@@ -33,12 +67,41 @@ def count_tokens(text: str) -> int:
     Returns:
         Number of tokens
     """
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
-    except Exception:
-        # Fallback to rough estimate: ~4 chars per token
-        return len(text) // 4
+    encoding = _get_encoding()
+    if encoding is not None:
+        try:
+            return len(encoding.encode(text))
+        except Exception:
+            pass
+    # Fallback to rough estimate: ~4 chars per token
+    return len(text) // 4
+
+
+def _run_diff(repo_path: str, args: list[str]) -> str:
+    """Run a git diff command and decode its output as UTF-8.
+
+    The output is captured as bytes and decoded in one pass instead of using
+    text=True, which decodes with the locale encoding and then rewrites every
+    line ending. Undecodable bytes (e.g. Latin-1 source files) are replaced
+    rather than raising.
+
+    Args:
+        repo_path: Path to the git repository
+        args: Full git command line
+
+    Returns:
+        Decoded diff output
+
+    Raises:
+        subprocess.CalledProcessError: If git command fails
+    """
+    result = subprocess.run(
+        args,
+        cwd=repo_path,
+        capture_output=True,
+        check=True
+    )
+    return result.stdout.decode('utf-8', errors='replace')
 
 
 def get_diff(repo_path: str) -> str:
@@ -50,50 +113,104 @@ def get_diff(repo_path: str) -> str:
     Returns:
         Raw git diff output for staged changes
 
+    Raises:
+        subprocess.CalledProcessError: If git command fails
+    """
+    return _run_diff(repo_path, ['git', 'diff', '--staged'])
+
+
+def has_staged_changes(repo_path: str) -> bool:
+    """Check whether anything is staged, without producing the diff.
+
+    `git diff --quiet` only reports through its exit code, so this is a cheap
+    probe to run before get_diff() and get_file_stats().
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        True if the index differs from HEAD
+
     Raises:
         subprocess.CalledProcessError: If git command fails
     """
     result = subprocess.run(
-        ['git', 'diff', '--staged'],
+        ['git', 'diff', '--staged', '--quiet'],
         cwd=repo_path,
-        capture_output=True,
-        text=True,
-        check=True
+        capture_output=True
     )
-    return result.stdout
+    # Exit code 1 means differences were found; anything else is an error
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(
+            result.returncode, result.args, result.stdout, result.stderr
+        )
+    return result.returncode == 1
 
 
-def get_file_stats(repo_path: str) -> dict:
-    """Get statistics about staged files only.
+def _status_entries(repo_path: str, untracked: str) -> list[tuple[str, str, str]]:
+    """List file statuses from a single `git status --porcelain=v2 -z` call.
+
+    NUL-delimited output keeps paths with spaces or non-ASCII characters
+    unquoted, and renames report the new path separately from the original.
 
     Args:
         repo_path: Path to the git repository
+        untracked: Value for --untracked-files ('no' or 'all')
 
     Returns:
-        Dict with staged file changes
+        List of (index_status, worktree_status, path) tuples. Status codes are
+        git's XY letters with '.' for unchanged; untracked files are ('?', '?', path).
     """
-    # Get list of changed files with status
-    status_result = subprocess.run(
-        ['git', 'status', '--porcelain'],
+    result = subprocess.run(
+        ['git', 'status', '--porcelain=v2', '-z', f'--untracked-files={untracked}'],
         cwd=repo_path,
         capture_output=True,
-        text=True,
         check=True
     )
-
-    # Parse file status
-    # Format: XY filepath (X=staged, Y=unstaged, space=no change)
-    files = []
-    for line in status_result.stdout.strip().split('\n'):
-        if not line:
+    records = result.stdout.decode('utf-8', errors='replace').split('\0')
+
+    entries = []
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        kind = record[:1]
+        if kind == '1':
+            # 1 XY sub mH mI mW hH hI path
+            fields = record.split(' ', 8)
+        elif kind == '2':
+            # 2 XY sub mH mI mW hH hI Xscore path, then origPath as its own record
+            fields = record.split(' ', 9)
+            i += 1
+        elif kind == 'u':
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path (unmerged)
+            fields = record.split(' ', 10)
+        elif kind == '?':
+            entries.append(('?', '?', record[2:]))
+            continue
+        else:
+            # Empty trailing record or ignored file ('!')
             continue
+        xy = fields[1]
+        entries.append((xy[0], xy[1], fields[-1]))
 
-        # First 2 chars are status codes (XY), rest is filepath
-        staged_status = line[0]
-        filepath = line[2:].strip()  # Skip status codes and strip whitespace
+    return entries
 
-        # Skip files with no staged changes (untracked or not staged)
-        if staged_status in (' ', '?'):
+
+def get_file_stats(repo_path: str) -> dict:
+    """Get statistics about staged files only.
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        Dict with staged file changes
+    """
+    files = []
+    # Untracked files are never staged, so don't make git look for them
+    for staged_status, _, filepath in _status_entries(repo_path, 'no'):
+        # Skip files with no staged changes
+        if staged_status == '.':
             continue
 
         file_status = 'modified'
@@ -114,6 +231,98 @@ def get_file_stats(repo_path: str) -> dict:
     return {'files': files}
 
 
+@functools.lru_cache(maxsize=DIFF_CACHE_SIZE)
+def _index_diff(diff_text: str) -> tuple[list[int], int, bool]:
+    """Compute line start offsets and the total token count of a diff.
+
+    Memoized on the diff text so fetching later pages of the same diff
+    doesn't re-scan or re-encode it. Callers must not mutate the returned list.
+
+    Only the total is approximate for large diffs: each page's own token count
+    is still measured exactly by paginate_diff().
+
+    Args:
+        diff_text: Full diff text
+
+    Returns:
+        Tuple of (line_starts, total_tokens, estimated). line_starts[i] is the
+        character offset where line i begins; a final entry one past the end of
+        the text lets line i's end be read as line_starts[i + 1] - 1. estimated
+        is True when total_tokens was extrapolated from a prefix of the diff.
+    """
+    # Derive offsets from newline positions without materializing the lines themselves
+    line_starts = [0]
+    line_starts.extend(m.end() for m in _NEWLINE_PATTERN.finditer(diff_text))
+    line_starts.append(len(diff_text) + 1)
+
+    if len(diff_text) <= TOKEN_SAMPLE_CHARS:
+        return line_starts, count_tokens(diff_text), False
+    sample_tokens = count_tokens(diff_text[:TOKEN_SAMPLE_CHARS])
+    return line_starts, round(sample_tokens * len(diff_text) / TOKEN_SAMPLE_CHARS), True
+
+
+def _fit_chunk(
+    line_starts: list[int],
+    start_line: int,
+    max_tokens: int,
+    chars_per_token: float,
+    measure: Callable[[int], tuple[str, int]]
+) -> tuple[int, str, int]:
+    """Find the end line of a page filling, but not exceeding, the token budget.
+
+    Starts from an estimate based on the diff's overall chars/token ratio, then
+    corrects it with the page's own measured ratio: shrinking while over budget
+    (always keeping at least one line), and growing while well under it.
+
+    Args:
+        line_starts: Line start offsets from _index_diff()
+        start_line: First line of the page
+        max_tokens: Token budget for the page
+        chars_per_token: Average characters per token of the whole diff
+        measure: Returns (text, token count) of the page ending before a given line
+
+    Returns:
+        Tuple of (end_line, chunk_text, chunk_tokens)
+    """
+    total_lines = len(line_starts) - 1
+
+    # Find the last whole line within the estimated character budget by bisecting
+    # the line offsets (slightly under budget to absorb local variance)
+    budget_chars = int(max_tokens * chars_per_token * 0.95)
+    chunk_start = line_starts[start_line]
+    end_line = bisect.bisect_right(line_starts, chunk_start + budget_chars + 1) - 1
+    end_line = min(max(end_line, start_line + 1), total_lines)
+    chunk_text, chunk_tokens = measure(end_line)
+
+    # Shrink proportionally while the chunk is denser than average. over_end is
+    # the smallest end line known to exceed the budget.
+    over_end = total_lines + 1
+    while chunk_tokens > max_tokens and end_line - start_line > 1:
+        over_end = end_line
+        scaled = start_line + (end_line - start_line) * max_tokens * 95 // (chunk_tokens * 100)
+        end_line = max(start_line + 1, min(scaled, end_line - 1))
+        chunk_text, chunk_tokens = measure(end_line)
+
+    # Grow proportionally while the chunk is sparser than average, until it is
+    # nearly full or adjacent to a known over-budget end line
+    attempts = 0
+    while (chunk_tokens < max_tokens * PAGE_FILL_TARGET
+           and end_line < total_lines
+           and over_end - end_line > 1
+           and attempts < MAX_PAGE_GROW_ATTEMPTS):
+        attempts += 1
+        scaled = start_line + (end_line - start_line) * max_tokens * 97 // (max(chunk_tokens, 1) * 100)
+        # Once an over-budget end line is known, don't overshoot past the midpoint
+        candidate = min(max(scaled, end_line + 1), (end_line + over_end) // 2, total_lines)
+        text, tokens = measure(candidate)
+        if tokens <= max_tokens:
+            end_line, chunk_text, chunk_tokens = candidate, text, tokens
+        else:
+            over_end = candidate
+
+    return end_line, chunk_text, chunk_tokens
+
+
 def paginate_diff(diff_text: str, cursor: Optional[str], max_tokens: int = MAX_RESPONSE_TOKENS) -> dict:
     """Paginate diff output by token count (MCP limit: 25k tokens).
 
@@ -141,9 +350,8 @@ def paginate_diff(diff_text: str, cursor: Optional[str], max_tokens: int = MAX_R
             }
         }
 
-    lines = diff_text.split('\n')
-    total_lines = len(lines)
-    total_tokens = count_tokens(diff_text)
+    line_starts, total_tokens, total_estimated = _index_diff(diff_text)
+    total_lines = len(line_starts) - 1
 
     # Parse cursor (line number) or start from 0
     start_line = 0
@@ -152,34 +360,39 @@ def paginate_diff(diff_text: str, cursor: Optional[str], max_tokens: int = MAX_R
             start_line = int(cursor)
         except ValueError:
             start_line = 0
-
-    # Build chunk line by line, staying under token limit
-    chunk_lines = []
-    chunk_text = ""
-    end_line = start_line
-
-    for i in range(start_line, total_lines):
-        line = lines[i]
-        test_chunk = chunk_text + line + '\n'
-        test_tokens = count_tokens(test_chunk)
-
-        if test_tokens > max_tokens and chunk_lines:
-            # Would exceed limit, stop here
-            break
-
-        chunk_lines.append(line)
-        chunk_text = test_chunk
-        end_line = i + 1
+    start_line = min(max(start_line, 0), total_lines)
+
+    chunk_start = line_starts[start_line]
+
+    def measure(end: int) -> tuple[str, int]:
+        text = diff_text[chunk_start:line_starts[end] - 1] if end > start_line else ''
+        return text, count_tokens(text)
+
+    # If everything from the cursor on fits the budget, return it as the last page.
+    # The whole diff's total is already exact; a remainder that plausibly fits is
+    # confirmed with one encode.
+    chars_per_token = len(diff_text) / max(total_tokens, 1)
+    remainder_chars = len(diff_text) - chunk_start
+    end_line = None
+    if start_line == 0 and not total_estimated and total_tokens <= max_tokens:
+        end_line = total_lines
+        chunk_text, chunk_tokens = diff_text, total_tokens
+    elif remainder_chars <= max_tokens * chars_per_token * 1.1:
+        chunk_text, chunk_tokens = measure(total_lines)
+        if chunk_tokens <= max_tokens:
+            end_line = total_lines
+    if end_line is None:
+        end_line, chunk_text, chunk_tokens = _fit_chunk(
+            line_starts, start_line, max_tokens, chars_per_token, measure
+        )
 
     # Determine next cursor
     next_cursor = None
     if end_line < total_lines:
         next_cursor = str(end_line)
 
-    chunk_tokens = count_tokens(chunk_text)
-
-    return {
-        'diff_chunk': '\n'.join(chunk_lines),
+    result = {
+        'diff_chunk': chunk_text,
         'next_cursor': next_cursor,
         'chunk_info': {
             'start_line': start_line,
@@ -190,6 +403,9 @@ def paginate_diff(diff_text: str, cursor: Optional[str], max_tokens: int = MAX_R
             'chunk_percentage': round((chunk_tokens / total_tokens * 100) if total_tokens > 0 else 100, 1)
         }
     }
+    if total_estimated:
+        result['chunk_info']['total_tokens_estimated'] = True
+    return result
 
 
 def execute_commit(repo_path: str, message: str) -> str:
@@ -228,9 +444,55 @@ def execute_commit(repo_path: str, message: str) -> str:
     return f"Successfully committed as {commit_hash}\n{result.stdout}"
 
 
+@functools.lru_cache(maxsize=REPO_CACHE_SIZE)
+def _git_dirs(repo_path: str) -> tuple[str, str]:
+    """Locate a repository's git directory and common directory (shared by worktrees).
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        Tuple of (git_dir, common_dir) absolute paths
+
+    Raises:
+        subprocess.CalledProcessError: If repo_path is not a git repository
+    """
+    result = subprocess.run(
+        ['git', 'rev-parse', '--absolute-git-dir', '--git-common-dir'],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    git_dir, common_dir = result.stdout.splitlines()
+    # --git-common-dir is printed relative to the working directory unless absolute
+    return git_dir, os.path.normpath(os.path.join(repo_path, common_dir))
+
+
+def _file_version(path: str) -> Optional[tuple[int, int, int]]:
+    """Identify the current version of a file for cache invalidation.
+
+    Git rewrites HEAD and config by renaming a lock file over them, so the inode
+    changes even when two writes land within the filesystem's mtime resolution.
+
+    Args:
+        path: File to stat
+
+    Returns:
+        Tuple of (mtime_ns, inode, size), or None if the file doesn't exist
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ino, st.st_size
+
+
 def get_current_branch(repo_path: str) -> str:
     """Get the current git branch name.
 
+    Cached per repository until HEAD changes (checkout, branch rename).
+
     Args:
         repo_path: Path to the git repository
 
@@ -240,6 +502,13 @@ def get_current_branch(repo_path: str) -> str:
     Raises:
         subprocess.CalledProcessError: If git command fails
     """
+    git_dir, _ = _git_dirs(repo_path)
+    return _get_current_branch_cached(repo_path, _file_version(os.path.join(git_dir, 'HEAD')))
+
+
+@functools.lru_cache(maxsize=REPO_CACHE_SIZE)
+def _get_current_branch_cached(repo_path: str, head_version: Optional[tuple[int, int, int]]) -> str:
+    """Read the current branch, memoized on the repo path and HEAD file version."""
     result = subprocess.run(
         ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
         cwd=repo_path,
@@ -268,14 +537,7 @@ def get_branch_diff(repo_path: str, base_branch: str, head_branch: Optional[str]
         head_branch = get_current_branch(repo_path)
 
     # Use three-dot diff to compare from common ancestor
-    result = subprocess.run(
-        ['git', 'diff', f'{base_branch}...{head_branch}'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    return result.stdout
+    return _run_diff(repo_path, ['git', 'diff', f'{base_branch}...{head_branch}'])
 
 
 def get_branch_commits(repo_path: str, base_branch: str, head_branch: Optional[str] = None) -> list[dict]:
@@ -384,14 +646,7 @@ def get_working_diff(repo_path: str) -> str:
     Returns:
         Raw git diff output for unstaged working tree changes
     """
-    result = subprocess.run(
-        ['git', 'diff'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    return result.stdout
+    return _run_diff(repo_path, ['git', 'diff'])
 
 
 def get_untracked_files(repo_path: str) -> list[str]:
@@ -416,6 +671,9 @@ def get_untracked_files(repo_path: str) -> list[str]:
 def get_working_file_stats(repo_path: str) -> dict:
     """Get file statistics for working tree changes (modified + untracked).
 
+    Untracked files are listed individually (not collapsed into their directory),
+    so the 'added' entries match get_untracked_files() without a second git call.
+
     Args:
         repo_path: Path to the git repository
 
@@ -424,30 +682,14 @@ def get_working_file_stats(repo_path: str) -> dict:
     """
     files = []
 
-    # Get modified/deleted files in working tree
-    status_result = subprocess.run(
-        ['git', 'status', '--porcelain'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True,
-        check=True
-    )
-
-    for line in status_result.stdout.strip().split('\n'):
-        if not line:
-            continue
-
-        # Format: XY filepath (X=staged, Y=unstaged)
-        unstaged_status = line[1]
-        filepath = line[2:].strip()
-
+    # Get modified/deleted and untracked files in working tree
+    for staged_status, unstaged_status, filepath in _status_entries(repo_path, 'all'):
         # Only include unstaged working tree changes
         if unstaged_status == 'M':
             files.append({'path': filepath, 'status': 'modified'})
         elif unstaged_status == 'D':
             files.append({'path': filepath, 'status': 'deleted'})
-        elif line[0] == '?':
-            # Untracked files show as ?? filepath
+        elif staged_status == '?':
             files.append({'path': filepath, 'status': 'added'})
 
     return {'files': files}
@@ -456,15 +698,33 @@ def get_working_file_stats(repo_path: str) -> dict:
 def detect_git_platform(repo_path: str) -> str:
     """Detect git platform from remote URL.
 
+    Cached per repository until the git config changes (e.g. remote added or edited).
+
     Args:
         repo_path: Path to the git repository
 
     Returns:
         Platform name: 'github', 'gitlab', 'bitbucket', or 'unknown'
-
-    Raises:
-        subprocess.CalledProcessError: If git command fails
     """
+    try:
+        _, common_dir = _git_dirs(repo_path)
+    except subprocess.CalledProcessError:
+        return 'unknown'
+    return _detect_git_platform_cached(repo_path, _file_version(os.path.join(common_dir, 'config')))
+
+
+# Remote URL substrings identifying each platform, checked in order. Any host
+# containing 'gitlab' counts, to cover self-hosted GitLab instances.
+_PLATFORM_MARKERS = (
+    ('github.com', 'github'),
+    ('gitlab', 'gitlab'),
+    ('bitbucket.org', 'bitbucket'),
+)
+
+
+@functools.lru_cache(maxsize=REPO_CACHE_SIZE)
+def _detect_git_platform_cached(repo_path: str, config_version: Optional[tuple[int, int, int]]) -> str:
+    """Detect the platform, memoized on the repo path and git config file version."""
     try:
         result = subprocess.run(
             ['git', 'remote', 'get-url', 'origin'],
@@ -474,18 +734,14 @@ def detect_git_platform(repo_path: str) -> str:
             check=True
         )
         remote_url = result.stdout.strip().lower()
-
-        if 'github.com' in remote_url:
-            return 'github'
-        elif 'gitlab.com' in remote_url or 'gitlab' in remote_url:
-            return 'gitlab'
-        elif 'bitbucket.org' in remote_url:
-            return 'bitbucket'
-        else:
-            return 'unknown'
     except subprocess.CalledProcessError:
         return 'unknown'
 
+    for marker, platform in _PLATFORM_MARKERS:
+        if marker in remote_url:
+            return platform
+    return 'unknown'
+
 
 def execute_pr_creation(
     repo_path: str,
@@ -4,17 +4,35 @@ Scans added lines in git diffs for potential secrets (API keys, passwords,
 tokens, private keys, etc.) using Yelp's detect-secrets library.
 """
 
-import os
+import copy
+import functools
+import io
 import re
-import tempfile
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Union, cast
 
-from detect_secrets.core.scan import scan_file
-from detect_secrets.settings import transient_settings
+from detect_secrets.core.potential_secret import PotentialSecret
+from detect_secrets.core.scan import _process_line_based_plugins
+from detect_secrets.settings import Settings, cache_bust, configure_settings_from_baseline
+from detect_secrets.transformers import get_transformed_file
+from detect_secrets.types import NamedIO
+
+from .config import DEFAULTS
 
 # Maximum number of findings to return (avoid flooding the MCP response)
 MAX_FINDINGS = 20
 
+# Number of recent scan results kept, keyed on the diff text and scan options
+SCAN_CACHE_SIZE = 8
+
+# Added lines are handed to the detectors in slices of at most this many bytes,
+# so a huge generated file is scanned piecewise instead of as one line list
+MAX_SCAN_BYTES_PER_SLICE = 256 * 1024
+
+# Paths skipped by default (regexes searched in the diff path): vendored
+# dependencies, lockfiles and minified bundles. Defined once in the config
+# defaults, where .devnarrate/config.toml [secrets] skip_paths overrides them.
+DEFAULT_SKIP_PATHS = tuple(DEFAULTS["secrets"]["skip_paths"])
+
 # detect-secrets plugin configuration
 # We enable provider-specific detectors + KeywordDetector (catches password="admin123")
 # + entropy detectors for unknown token formats
@@ -51,7 +69,7 @@ SCANNER_CONFIG = {
     ],
     # Filters that reduce false positives while scanning diff-extracted lines
     # We OMIT: is_invalid_file, is_non_text_file, is_lock_file, is_swagger_file
-    # because we're scanning temp files, not the original repo files
+    # because we're scanning lines extracted from the diff, not the original repo files
     "filters_used": [
         {"path": "detect_secrets.filters.allowlist.is_line_allowlisted"},
         {"path": "detect_secrets.filters.heuristic.is_indirect_reference"},
@@ -65,6 +83,32 @@ SCANNER_CONFIG = {
 }
 
 
+@functools.lru_cache(maxsize=1)
+def _get_scanner_settings() -> Settings:
+    """Apply SCANNER_CONFIG to detect-secrets' global settings once.
+
+    detect-secrets keeps its plugin and filter configuration in process-wide
+    settings and caches the instantiated detectors. Wrapping every scan in
+    transient_settings() busts those caches on entry and exit, rebuilding all
+    detectors per call; configuring once lets the cached detectors be reused.
+
+    Returns:
+        The configured detect-secrets Settings instance
+    """
+    # Drop anything cached under a previous configuration before applying ours
+    cache_bust()
+    return configure_settings_from_baseline(SCANNER_CONFIG)
+
+
+# Hunk header: @@ -old[,count] +new[,count] @@ — captures the new-file start line
+_HUNK_HEADER_PATTERN = re.compile(r'@@ -\S+ \+(\d+)')
+
+# Lines the parser has to inspect: added lines, +++ file headers, hunk headers and
+# the 'diff --git' lines opening each file section. Everything else is only
+# counted (context lines) or ignored (removed lines).
+_CHANGE_LINE_PATTERN = re.compile(r'^(?:[+@]|diff --git ).*', re.MULTILINE)
+
+
 def _parse_diff_added_lines(diff_text: str) -> dict[str, list[tuple[int, str]]]:
     """Parse a unified diff and extract only added lines per file.
 
@@ -78,36 +122,168 @@ def _parse_diff_added_lines(diff_text: str) -> dict[str, list[tuple[int, str]]]:
     files: dict[str, list[tuple[int, str]]] = {}
     current_file: Optional[str] = None
     current_line = 0
-
-    for line in diff_text.split('\n'):
-        if line.startswith('+++ b/'):
-            current_file = line[6:]
-            if current_file not in files:
-                files[current_file] = []
-        elif line.startswith('+++ /dev/null'):
-            # File being deleted — skip
-            current_file = None
-        elif line.startswith('@@'):
-            # Parse hunk header: @@ -old,count +new,count @@
-            m = re.search(r'\+(\d+)', line)
-            if m:
-                current_line = int(m.group(1))
-        elif line.startswith('+') and not line.startswith('+++'):
-            # Added line
-            if current_file is not None:
+    # '---'/'+++' are file headers only between 'diff --git' and the section's
+    # first '@@'; inside a hunk they are a removed '--…' / added '++…' line.
+    # Input starting without 'diff --git' begins in a header.
+    in_header = True
+
+    # Jump between added/header lines with the regex engine. Lines in between are
+    # never materialized: context lines advance the new-file line counter, removed
+    # lines (and --- headers) don't, so count newlines minus those starting a '-' line.
+    next_line_start = 0
+    for m in _CHANGE_LINE_PATTERN.finditer(diff_text):
+        start = m.start()
+        if current_file is not None and start > next_line_start:
+            # next_line_start >= 1 here (a +++ line was matched), so the '\n-' count
+            # starting one character early sees a removed line right at next_line_start
+            current_line += (diff_text.count('\n', next_line_start, start)
+                             - diff_text.count('\n-', next_line_start - 1, start))
+        next_line_start = m.end() + 1
+        line = m.group()
+
+        # Unified diff line kinds are determined by the first character,
+        # so branch on it once instead of running a startswith chain
+        c = line[0]
+        if c == '+':
+            if in_header and line.startswith('+++ '):
+                if line.startswith('+++ b/'):
+                    current_file = line[6:]
+                    if current_file not in files:
+                        files[current_file] = []
+                elif line.startswith('+++ /dev/null'):
+                    # File being deleted — skip
+                    current_file = None
+            elif current_file is not None:
+                # Added line
                 files[current_file].append((current_line, line[1:]))  # strip leading +
                 current_line += 1
-        elif line.startswith('-') or line.startswith('---'):
-            # Removed line or diff header — don't increment line counter
-            pass
+        elif c == '@':
+            # Parse hunk header: @@ -old,count +new,count @@
+            hunk = _HUNK_HEADER_PATTERN.match(line)
+            if hunk:
+                current_line = int(hunk.group(1))
+                in_header = False
         else:
-            # Context line — increment line counter
-            if current_file is not None:
-                current_line += 1
+            # 'diff --git a/… b/…' starts the next file's headers
+            in_header = True
 
     return files
 
 
+@functools.lru_cache(maxsize=SCAN_CACHE_SIZE)
+def _compile_skip_paths(skip_paths: tuple[str, ...]) -> tuple[re.Pattern, ...]:
+    """Compile the configured skip-path patterns once per distinct config.
+
+    Empty and invalid patterns are dropped.
+
+    Args:
+        skip_paths: Tuple of regex strings searched in each diff path.
+
+    Returns:
+        Tuple of compiled patterns.
+    """
+    compiled = []
+    for regex_str in skip_paths:
+        if not regex_str:
+            continue
+        try:
+            compiled.append(re.compile(regex_str))
+        except re.error:
+            continue
+    return tuple(compiled)
+
+
+def _iter_scan_slices(
+    lines: list[tuple[int, str]],
+) -> Iterator[list[tuple[int, str]]]:
+    """Split a file's added lines into slices of at most MAX_SCAN_BYTES_PER_SLICE.
+
+    Args:
+        lines: The file's added (line_number, line_content) tuples
+
+    Yields:
+        Consecutive runs of lines; a single longer line forms a slice of its own
+    """
+    start = 0
+    slice_bytes = 0
+    for i, (_, line_content) in enumerate(lines):
+        line_bytes = len(line_content) + 1
+        if slice_bytes + line_bytes > MAX_SCAN_BYTES_PER_SLICE and i > start:
+            yield lines[start:i]
+            start = i
+            slice_bytes = 0
+        slice_bytes += line_bytes
+    if start < len(lines):
+        yield lines[start:]
+
+
+def _iter_transformed_lines(filepath: str, contents: list[str]) -> Iterator[list[str]]:
+    """Yield the line lists detect-secrets' scan_file() would scan, without a file.
+
+    Mirrors detect_secrets.core.scan._get_lines_from_file on an in-memory file:
+    first the regular transformers (e.g. YAML) or the raw lines, then, for the
+    caller to try if the first pass found nothing, the eager transformers (e.g.
+    the config-file parser that exposes unquoted KEY=value secrets in .env,
+    shell, Dockerfile and Makefile content).
+
+    Args:
+        filepath: Path of the file in the diff; its extension picks the transformers
+        contents: The added lines' text
+
+    Yields:
+        Line lists numbered like the input (transformers keep line positions)
+    """
+    file = io.StringIO("\n".join(contents) + "\n")
+    file.name = filepath
+    named_file = cast(NamedIO, file)
+
+    yield get_transformed_file(named_file) or file.readlines()
+
+    file.seek(0)
+    eager_lines = get_transformed_file(named_file, use_eager_transformers=True)
+    if eager_lines:
+        yield eager_lines
+
+
+def _detect_secrets_in_lines(
+    filepath: str,
+    lines: list[tuple[int, str]],
+) -> Iterator[tuple[int, PotentialSecret]]:
+    """Run the detect-secrets plugins over a file's added lines, slice by slice.
+
+    Scans in memory with scan_file()'s two passes (see _iter_transformed_lines):
+    the eager-transformer pass only runs when the first pass finds nothing.
+    detect-secrets builds its code-snippet context by indexing into the line
+    list, so lines are numbered by position within their slice (1-indexed) and
+    each finding is mapped back to the real file line.
+
+    NOTE: detect-secrets' own scan_diff()/SecretsCollection.scan_diff() are not
+    usable here: they run the is_invalid_file filter on each diff path relative
+    to the process cwd, silently skipping files that don't exist there (the MCP
+    server is not started from the repo root). They also skip the transformers.
+
+    Args:
+        filepath: Path of the file in the diff
+        lines: The file's added (line_number, line_content) tuples
+
+    Yields:
+        Tuples of (real line number, detected secret), lazily so the caller can
+        stop scanning at any point
+    """
+    for scan_slice in _iter_scan_slices(lines):
+        contents = [line_content for _, line_content in scan_slice]
+        for transformed in _iter_transformed_lines(filepath, contents):
+            found = False
+            numbered_lines = list(enumerate(transformed, start=1))
+            for secret in _process_line_based_plugins(numbered_lines, filename=filepath):
+                found = True
+                # Transformers keep line positions; clamp rather than drop a finding
+                position = min(max(secret.line_number, 1), len(scan_slice))
+                yield scan_slice[position - 1][0], secret
+            if found:
+                break
+
+
 def _redact_value(value: str, show_chars: int = 4) -> str:
     """Redact a secret value, showing only the first few characters.
 
@@ -123,24 +299,48 @@ def _redact_value(value: str, show_chars: int = 4) -> str:
     return value[:show_chars] + "...XXXX"
 
 
-def _build_custom_regex_findings(
-    parsed_files: dict[str, list[tuple[int, str]]],
-    custom_patterns: list[dict],
-) -> list[dict]:
-    """Scan added lines against user-defined regex patterns from config.
+# Backreferences and conditional group references ((?(1)...)) would point at
+# the wrong group once patterns are combined
+_BACKREFERENCE_PATTERN = re.compile(r"\\[1-9]|\\g<|\(\?P=|\(\?\(")
+
+
+def _compile_union(patterns: Iterable[re.Pattern]) -> Optional[re.Pattern]:
+    """Combine compiled patterns into one alternation matching if any of them does.
 
     Args:
-        parsed_files: Dict mapping file paths to lists of (line_number, line_content).
-        custom_patterns: List of {"name": str, "pattern": str} dicts.
+        patterns: Compiled regex patterns
 
     Returns:
-        List of finding dicts matching the standard format.
+        The combined pattern, or None if the patterns can't be combined safely
+        (backreferences, clashing group names, inline global flags)
+    """
+    sources = []
+    for pattern in patterns:
+        if _BACKREFERENCE_PATTERN.search(pattern.pattern):
+            return None
+        sources.append(f"(?:{pattern.pattern})")
+    try:
+        return re.compile("|".join(sources))
+    except re.error:
+        return None
+
+
+@functools.lru_cache(maxsize=SCAN_CACHE_SIZE)
+def _compile_custom_patterns(
+    custom_patterns: tuple[tuple[str, str], ...],
+) -> tuple[tuple[tuple[str, re.Pattern], ...], Optional[re.Pattern]]:
+    """Compile user-defined patterns once per distinct config.
+
+    Empty and invalid patterns are dropped.
+
+    Args:
+        custom_patterns: Tuple of (name, pattern) pairs.
+
+    Returns:
+        Tuple of (compiled (name, regex) pairs, union prefilter or None).
     """
-    findings = []
     compiled = []
-    for pat in custom_patterns:
-        name = pat.get("name", "Custom Pattern")
-        regex_str = pat.get("pattern", "")
+    for name, regex_str in custom_patterns:
         if not regex_str:
             continue
         try:
@@ -148,20 +348,42 @@ def _build_custom_regex_findings(
         except re.error:
             continue
 
+    # One alternation of every pattern rejects lines matching none of them in a
+    # single search, instead of one search per pattern; lines that do match are
+    # re-checked in order so the first listed pattern still names the finding
+    return tuple(compiled), _compile_union(regex for _, regex in compiled)
+
+
+def _build_custom_regex_findings(
+    parsed_files: dict[str, list[tuple[int, str]]],
+    custom_patterns: tuple[tuple[str, str], ...],
+) -> list[dict]:
+    """Scan added lines against user-defined regex patterns from config.
+
+    Args:
+        parsed_files: Dict mapping file paths to lists of (line_number, line_content).
+        custom_patterns: Tuple of (name, pattern) pairs.
+
+    Returns:
+        List of finding dicts matching the standard format.
+    """
+    findings = []
+    compiled, prefilter = _compile_custom_patterns(custom_patterns)
     if not compiled:
         return findings
 
     for filepath, lines in parsed_files.items():
         for real_line_no, line_content in lines:
+            if prefilter is not None and not prefilter.search(line_content):
+                continue
             for name, regex in compiled:
-                if regex.search(line_content):
+                match = regex.search(line_content)
+                if match:
                     findings.append({
                         "file": filepath,
                         "line": real_line_no,
                         "type": name,
-                        "match_preview": _redact_value(
-                            regex.search(line_content).group(0)
-                        ),
+                        "match_preview": _redact_value(match.group(0)),
                     })
                     break  # one match per line is enough
 
@@ -169,9 +391,10 @@ def _build_custom_regex_findings(
 
 
 def scan_diff(
-    diff_text: str,
+    diff_text: Union[str, bytes],
     max_findings: Optional[int] = None,
     custom_patterns: Optional[list[dict]] = None,
+    skip_paths: Optional[list[str]] = None,
 ) -> dict:
     """Scan added lines in a staged diff for potential secrets.
 
@@ -184,22 +407,61 @@ def scan_diff(
     and are not our concern for the current commit.
 
     Args:
-        diff_text: Raw `git diff --staged` output
-        max_findings: Cap on returned findings (default: MAX_FINDINGS).
+        diff_text: Raw `git diff --staged` output, as text or undecoded bytes
+                   (decoded as UTF-8 with invalid sequences replaced)
+        max_findings: Cap on returned findings (default: MAX_FINDINGS). The
+                      scan stops at the first finding beyond this many.
                       Configurable via .devnarrate/config.toml [secrets] max_findings.
         custom_patterns: Extra regex patterns from config, each a dict with
                          "name" and "pattern" keys.
+        skip_paths: Regexes for diff paths not to scan (default:
+                    DEFAULT_SKIP_PATHS); an empty list scans every file.
+                    Configurable via .devnarrate/config.toml [secrets] skip_paths.
 
     Returns:
         Dict with:
-        - status: "clean" or "warnings_found"
-        - findings: list of detected secrets (capped at max_findings)
-        - total_findings: total count before capping
+        - status: "clean", "warnings_found", or "files_skipped" when nothing
+          was found but some files were not scanned
+        - findings: list of detected secrets (at most max_findings)
+        - total_findings: number of findings returned (a lower bound if truncated)
+        - truncated: True if scanning stopped at a finding beyond max_findings;
+          only present when set
         - message: human-readable summary
+        - skipped_files: files not scanned because their path matches
+          skip_paths; only present when non-empty
+    """
+    # detect-secrets works on text, so decode raw git output once up front
+    if isinstance(diff_text, bytes):
+        diff_text = diff_text.decode("utf-8", errors="replace")
+
+    # Custom patterns arrive as a list of dicts; freeze them into a hashable key
+    patterns_key = tuple(
+        (pat.get("name", "Custom Pattern"), pat.get("pattern", ""))
+        for pat in custom_patterns or ()
+    )
+    skip_key = DEFAULT_SKIP_PATHS if skip_paths is None else tuple(skip_paths)
+    # Copy so callers can't mutate the cached result
+    return copy.deepcopy(
+        _scan_diff_cached(diff_text, max_findings, patterns_key, skip_key)
+    )
+
+
+@functools.lru_cache(maxsize=SCAN_CACHE_SIZE)
+def _scan_diff_cached(
+    diff_text: str,
+    max_findings: Optional[int],
+    custom_patterns: tuple[tuple[str, str], ...],
+    skip_paths: tuple[str, ...],
+) -> dict:
+    """Scan a diff for secrets, memoized on the diff text and scan options.
+
+    Repeated get_commit_context calls on an unchanged staging area hit the
+    cache instead of rescanning. See scan_diff() for arguments and result.
+    Callers must not mutate the returned dict.
     """
     cap = max_findings if max_findings is not None else MAX_FINDINGS
 
-    if not diff_text or not diff_text.strip():
+    if not diff_text or diff_text.isspace():
         return {
             "status": "clean",
             "findings": [],
@@ -218,55 +480,55 @@ def scan_diff(
             "message": "No added lines to scan.",
         }
 
+    # Drop files that can't reasonably hold hand-written secrets before the
+    # expensive detector pass (and custom patterns) see them. Binary files need
+    # no check: git reports them without a +++ header, so they have no lines.
+    skip_patterns = _compile_skip_paths(skip_paths)
+    skipped_files = [
+        filepath for filepath, lines in parsed_files.items()
+        if lines and any(pattern.search(filepath) for pattern in skip_patterns)
+    ]
+    for filepath in skipped_files:
+        del parsed_files[filepath]
+
     all_findings = []
     # Track (file, line) to deduplicate when multiple detectors match the same line
     seen_locations: set[tuple[str, int]] = set()
 
-    with transient_settings(SCANNER_CONFIG):
-        for filepath, lines in parsed_files.items():
-            if not lines:
-                continue
+    # Configure detect-secrets on first use (no-op on later calls)
+    _get_scanner_settings()
 
-            # Build line number mapping: temp_file_line -> real_file_line
-            line_map: dict[int, int] = {}
-            content_lines: list[str] = []
-            for i, (real_line_no, line_content) in enumerate(lines):
-                content_lines.append(line_content)
-                line_map[i + 1] = real_line_no  # detect-secrets uses 1-indexed lines
-
-            # Write added lines to a temp file for scanning
-            # Use the original file extension so detect-secrets applies correct parsing
-            _, ext = os.path.splitext(filepath)
-            tmp_fd, tmppath = tempfile.mkstemp(suffix=ext or '.txt', prefix='devnarrate_')
-
-            try:
-                with os.fdopen(tmp_fd, 'w') as f:
-                    f.write('\n'.join(content_lines) + '\n')
-
-                for secret in scan_file(tmppath):
-                    real_line = line_map.get(secret.line_number, secret.line_number)
-                    location_key = (filepath, real_line)
-
-                    # Deduplicate: if we already have a finding for this file+line,
-                    # skip it (multiple detectors can flag the same secret)
-                    if location_key in seen_locations:
-                        continue
-                    seen_locations.add(location_key)
-
-                    all_findings.append({
-                        "file": filepath,
-                        "line": real_line,
-                        "type": secret.type,
-                        "match_preview": _redact_value(
-                            secret.secret_value if secret.secret_value else ""
-                        ),
-                    })
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(tmppath)
-                except OSError:
-                    pass
+    # Stop running the detectors at the first finding beyond the cap: the caller
+    # halts on any finding anyway, and a leaked credential dump shouldn't cost a
+    # full scan
+    truncated = False
+
+    for filepath, lines in parsed_files.items():
+        if truncated:
+            break
+        if not lines:
+            continue
+
+        for real_line, secret in _detect_secrets_in_lines(filepath, lines):
+            location_key = (filepath, real_line)
+
+            # Deduplicate: if we already have a finding for this file+line,
+            # skip it (multiple detectors can flag the same secret)
+            if location_key in seen_locations:
+                continue
+            seen_locations.add(location_key)
+
+            if len(all_findings) >= cap:
+                truncated = True
+                break
+            all_findings.append({
+                "file": filepath,
+                "line": real_line,
+                "type": secret.type,
+                "match_preview": _redact_value(
+                    secret.secret_value if secret.secret_value else ""
+                ),
+            })
 
     # Run custom pattern matching if configured
     # Custom patterns take priority: if they match a line already flagged by a
@@ -282,27 +544,50 @@ def scan_diff(
                     f for f in all_findings
                     if (f["file"], f["line"]) != loc
                 ]
+            elif len(all_findings) >= cap:
+                truncated = True
+                break
             seen_locations.add(loc)
             all_findings.append(finding)
 
     total = len(all_findings)
-    capped = all_findings[:cap]
 
-    if total == 0:
-        return {
+    if total == 0 and not truncated:
+        result = {
             "status": "clean",
             "findings": [],
             "total_findings": 0,
             "message": "No secrets detected in staged changes.",
         }
-
-    message = f"{total} potential secret{'s' if total > 1 else ''} detected in staged changes. Review before committing."
-    if total > cap:
-        message += f" (showing first {cap} of {total})"
-
-    return {
-        "status": "warnings_found",
-        "findings": capped,
-        "total_findings": total,
-        "message": message,
-    }
+    else:
+        if total == 0:
+            # max_findings = 0: report that something was found without listing it
+            message = "Potential secrets detected in staged changes. Review before committing. (max_findings is 0, so none are listed)"
+        else:
+            count = f"{total}+" if truncated else str(total)
+            message = f"{count} potential secret{'s' if total != 1 or truncated else ''} detected in staged changes. Review before committing."
+            if truncated:
+                message += f" (scan stopped after {cap} finding{'s' if cap != 1 else ''}; fix these and rerun)"
+
+        result = {
+            "status": "warnings_found",
+            "findings": all_findings,
+            "total_findings": total,
+            "message": message,
+        }
+        if truncated:
+            result["truncated"] = True
+
+    if skipped_files:
+        # A clean result would claim more than was checked
+        if result["status"] == "clean":
+            result["status"] = "files_skipped"
+            result["message"] = "No secrets detected in scanned files."
+        result["skipped_files"] = skipped_files
+        result["message"] += (
+            f" Skipped {len(skipped_files)} file{'s' if len(skipped_files) > 1 else ''}"
+            f" matching [secrets] skip_paths (vendored, lock or minified); review"
+            f" {'them' if len(skipped_files) > 1 else 'it'} manually."
+        )
+
+    return result
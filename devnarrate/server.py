@@ -9,11 +9,18 @@ An MCP server that helps developers with:
 - Sharing development updates to Slack
 """
 
+import asyncio
+import functools
+import inspect
 import json
 import subprocess
-from typing import Optional
+import weakref
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Mapping, Optional
 
+from mcp import types
 from mcp.server.fastmcp import FastMCP
+from mcp.server.session import ServerSession
 
 from . import change_analyzer
 from . import config as config_module
@@ -23,13 +30,161 @@ from . import secret_scanner
 # Create MCP server instance
 mcp = FastMCP("devnarrate")
 
+# Repository root resolved from MCP roots, per client session. Roots rarely change
+# mid-session, so list_roots() is only requested again after the client sends a
+# roots/list_changed notification. Only sessions whose client declares the
+# roots.listChanged capability are cached; others are asked on every call, since
+# nothing would tell us their roots went stale.
+_session_roots: "weakref.WeakKeyDictionary[ServerSession, str]" = weakref.WeakKeyDictionary()
+
+# Static part of get_pr_context's template_instructions, shared read-only across calls
+_PR_TEMPLATE_INSTRUCTIONS = MappingProxyType({
+    'templates_directory': '.devnarrate/pr-templates/',
+    'default_template_available': True,
+    'steps': (
+        '1. Check if .devnarrate/pr-templates/ exists',
+        '2. If yes, list templates and ask user which to use',
+        '3. Read chosen template or use DEFAULT_PR_TEMPLATE',
+        '4. Fill template with analysis of commits and diff'
+    ),
+})
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize the read-only mappings shared between tool responses."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _to_json(result: dict) -> str:
+    """Encode a tool result as compact JSON.
+
+    Tool responses are parsed by the client, so indentation only adds bytes and
+    tokens against the response budget; non-ASCII text is emitted as-is rather
+    than as \\u escapes for the same reason.
+
+    Args:
+        result: JSON-serializable tool result (read-only mappings are allowed)
+
+    Returns:
+        JSON string
+    """
+    return json.dumps(result, separators=(',', ':'), ensure_ascii=False, default=_json_default)
+
+
+async def _resolve_repo_path(repo_path: Optional[str]) -> Optional[str]:
+    """Resolve the repository path, falling back to the client's first MCP root.
+
+    Args:
+        repo_path: Explicit repository path from the tool call, if any
+
+    Returns:
+        The repository path, or None if none was given and no roots are available
+    """
+    if repo_path is not None:
+        return repo_path
+
+    session = mcp.get_context().session
+    cached = _session_roots.get(session)
+    if cached is not None:
+        return cached
+
+    roots_result = await session.list_roots()
+    if not roots_result.roots:
+        return None
+    root = roots_result.roots[0].uri.path
+    if _roots_changes_tracked and _client_notifies_roots_changes(session):
+        _session_roots[session] = root
+    return root
+
+
+def _client_notifies_roots_changes(session: ServerSession) -> bool:
+    """Whether the client declared it sends roots/list_changed notifications."""
+    return session.check_client_capability(
+        types.ClientCapabilities(roots=types.RootsCapability(listChanged=True))
+    )
+
+
+def _json_tool(fn: Callable[..., Awaitable[dict]]) -> Callable[..., Awaitable[str]]:
+    """Wrap a tool body that returns a dict into a JSON-returning MCP tool.
+
+    The wrapper resolves repo_path from MCP roots before calling the body,
+    encodes the result with _to_json(), and reports any exception (or a missing
+    repository path) as a JSON {'error': ...} object.
+
+    Args:
+        fn: Async tool body taking a repo_path keyword argument
+
+    Returns:
+        The wrapped tool, with fn's signature (returning str) for schema generation
+    """
+    @functools.wraps(fn)
+    async def wrapper(**kwargs) -> str:
+        try:
+            # Get working directory from MCP roots if repo_path not provided
+            kwargs['repo_path'] = await _resolve_repo_path(kwargs.get('repo_path'))
+            if kwargs['repo_path'] is None:
+                return _to_json({'error': 'No repository path provided and no roots available'})
+            return _to_json(await fn(**kwargs))
+        except Exception as e:
+            return _to_json({'error': str(e)})
+
+    wrapper.__signature__ = inspect.signature(fn).replace(return_annotation=str)
+    return wrapper
+
+
+async def _on_roots_list_changed(notification: types.RootsListChangedNotification) -> None:
+    """Drop cached roots so the next tool call asks the client again."""
+    # The notification doesn't identify its session, so forget every cached root
+    _session_roots.clear()
+
+
+# FastMCP has no public API for client notification handlers, so register on
+# its low-level Server through the private _mcp_server attribute (present in the
+# supported mcp>=1.20 releases). Should a release drop it, roots are simply not
+# cached: every tool call asks the client, which is slower but never stale.
+_low_level_server = getattr(mcp, '_mcp_server', None)
+_roots_changes_tracked = isinstance(getattr(_low_level_server, 'notification_handlers', None), dict)
+if _roots_changes_tracked:
+    _low_level_server.notification_handlers[types.RootsListChangedNotification] = _on_roots_list_changed
+
+
+@functools.lru_cache(maxsize=8)
+def _commit_format_guide(
+    max_subject_length: int,
+    max_body_line_length: int,
+    types: tuple[str, ...],
+    require_scope: bool
+) -> Mapping[str, Any]:
+    """Build the commit_format_guide for a commit config, once per distinct config.
+
+    Args:
+        max_subject_length: Maximum subject line length
+        max_body_line_length: Maximum body line length
+        types: Allowed conventional commit types
+        require_scope: Whether a scope is mandatory
+
+    Returns:
+        Read-only mapping shared by every response with the same config
+    """
+    return MappingProxyType({
+        'subject_line': f'Max {max_subject_length} characters',
+        'body_line_length': f'Max {max_body_line_length} characters per line',
+        'format': 'type(scope): description\\n\\nBody paragraphs...\\n\\nFooter',
+        'types': types,
+        'require_scope': require_scope,
+        'important': 'DO NOT include AI signatures, attribution, or "Generated with" footers in the commit message'
+    })
+
 
 @mcp.tool()
+@_json_tool
 async def get_commit_context(
     cursor: Optional[str] = None,
     max_diff_tokens: int = 20000,
     repo_path: Optional[str] = None
-) -> str:
+) -> dict:
     """REQUIRED FIRST STEP: Get git diff and file changes to analyze before writing a commit message.
 
     IMPORTANT: You MUST call this tool FIRST before generating any commit message.
@@ -55,6 +210,9 @@ async def get_commit_context(
          Recommend removing the secret before committing.
          Do NOT proceed to generate a commit message until the user acknowledges
          or explicitly chooses to proceed despite the warnings.
+       - If "files_skipped": nothing was found, but the files in skipped_files
+         (vendored, lock or minified) were not scanned. Tell the user which
+         files were skipped, check their diff yourself in step 2, then proceed.
        - If "clean": proceed to step 2.
 
     2. SECRET SCAN (your review): Even if the automated scan is clean, briefly review
@@ -86,76 +244,70 @@ async def get_commit_context(
         - pagination_info: token counts and chunk info
         - commit_format_guide: formatting rules for commit messages
     """
-    try:
-        # Get working directory from MCP roots if repo_path not provided
-        if repo_path is None:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            if roots_result.roots:
-                repo_path = roots_result.roots[0].uri.path
-            else:
-                return json.dumps({'error': 'No repository path provided and no roots available'})
-
-        # Load project config
-        cfg = config_module.load_config(repo_path)
-        commit_cfg = cfg["commit"]
-        secrets_cfg = cfg["secrets"]
-
-        # Get file stats (staged changes only)
-        stats = git_operations.get_file_stats(repo_path)
-
-        # Get full diff (staged changes only)
-        diff_output = git_operations.get_diff(repo_path)
-
-        # Paginate diff by token count
-        paginated = git_operations.paginate_diff(diff_output, cursor, max_diff_tokens)
-
-        # Check if there are any changes - trust the diff as source of truth
-        # If git diff --staged is empty, there's nothing to commit
-        has_changes = bool(diff_output.strip())
-
-        # Scan for secrets in added lines (only on first page, not paginated follow-ups)
-        if has_changes and cursor is None and secrets_cfg.get("enabled", True):
-            secret_scan = secret_scanner.scan_diff(
-                diff_output,
-                max_findings=secrets_cfg.get("max_findings"),
-                custom_patterns=secrets_cfg.get("custom_patterns"),
-            )
-        else:
-            reason = 'No changes to scan.'
-            if has_changes and cursor is not None:
-                reason = 'Secret scan performed on first page only.'
-            elif has_changes and not secrets_cfg.get("enabled", True):
-                reason = 'Secret scanning disabled in .devnarrate/config.toml.'
-            secret_scan = {
-                'status': 'clean',
-                'findings': [],
-                'total_findings': 0,
-                'message': reason,
-            }
-
-        result = {
-            'repository': repo_path,
-            'has_changes': has_changes,
-            'files': stats['files'],
-            'secret_scan': secret_scan,
-            'diff': paginated['diff_chunk'],
-            'next_cursor': paginated['next_cursor'],
-            'pagination_info': paginated['chunk_info'],
-            'commit_format_guide': {
-                'subject_line': f'Max {commit_cfg["max_subject_length"]} characters',
-                'body_line_length': f'Max {commit_cfg["max_body_line_length"]} characters per line',
-                'format': 'type(scope): description\\n\\nBody paragraphs...\\n\\nFooter',
-                'types': commit_cfg["types"],
-                'require_scope': commit_cfg.get("require_scope", False),
-                'important': 'DO NOT include AI signatures, attribution, or "Generated with" footers in the commit message'
-            }
+    # Load project config
+    cfg = config_module.load_config(repo_path)
+    commit_cfg = cfg["commit"]
+    secrets_cfg = cfg["secrets"]
+
+    # Get file stats and full diff (staged changes only). The two git calls are
+    # independent, so run them concurrently off the event loop. Nothing staged is
+    # common when the tool is called preemptively, so probe for that first.
+    if await asyncio.to_thread(git_operations.has_staged_changes, repo_path):
+        stats, diff_output = await asyncio.gather(
+            asyncio.to_thread(git_operations.get_file_stats, repo_path),
+            asyncio.to_thread(git_operations.get_diff, repo_path),
+        )
+    else:
+        stats, diff_output = {'files': []}, ''
+
+    # Paginate diff by token count
+    paginated = git_operations.paginate_diff(diff_output, cursor, max_diff_tokens)
+
+    # Check if there are any changes - trust the diff as source of truth
+    # If git diff --staged is empty, there's nothing to commit
+    # (isspace() stops at the first non-blank character; strip() would copy the diff)
+    has_changes = bool(diff_output) and not diff_output.isspace()
+
+    # Scan for secrets in added lines (only on first page, not paginated follow-ups).
+    # Scanning is CPU-bound, so keep it off the event loop.
+    if has_changes and cursor is None and secrets_cfg.get("enabled", True):
+        secret_scan = await asyncio.to_thread(
+            secret_scanner.scan_diff,
+            diff_output,
+            max_findings=secrets_cfg.get("max_findings"),
+            custom_patterns=secrets_cfg.get("custom_patterns"),
+            skip_paths=secrets_cfg.get("skip_paths"),
+        )
+    else:
+        reason = 'No changes to scan.'
+        if has_changes and cursor is not None:
+            reason = 'Secret scan performed on first page only.'
+        elif has_changes and not secrets_cfg.get("enabled", True):
+            reason = 'Secret scanning disabled in .devnarrate/config.toml.'
+        secret_scan = {
+            'status': 'clean',
+            'findings': [],
+            'total_findings': 0,
+            'message': reason,
         }
 
-        return json.dumps(result, indent=2)
-
-    except Exception as e:
-        return json.dumps({'error': str(e)})
+    result = {
+        'repository': repo_path,
+        'has_changes': has_changes,
+        'files': stats['files'],
+        'secret_scan': secret_scan,
+        'diff': paginated['diff_chunk'],
+        'next_cursor': paginated['next_cursor'],
+        'pagination_info': paginated['chunk_info'],
+        'commit_format_guide': _commit_format_guide(
+            commit_cfg["max_subject_length"],
+            commit_cfg["max_body_line_length"],
+            tuple(commit_cfg["types"]),
+            commit_cfg.get("require_scope", False),
+        ),
+    }
+
+    return result
 
 
 @mcp.tool()
@@ -190,28 +342,26 @@ async def commit_changes(
         return "Error: user_approved must be True. Show the commit message to the user and get their approval first."
     try:
         # Get working directory from MCP roots if repo_path not provided
+        repo_path = await _resolve_repo_path(repo_path)
         if repo_path is None:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            if roots_result.roots:
-                repo_path = roots_result.roots[0].uri.path
-            else:
-                return "Error: No repository path provided and no roots available"
-
-        result = git_operations.execute_commit(repo_path, message)
+            return "Error: No repository path provided and no roots available"
+
+        # Run git off the event loop so a slow commit (e.g. hooks) doesn't stall other tool calls
+        result = await asyncio.to_thread(git_operations.execute_commit, repo_path, message)
         return result
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
+@_json_tool
 async def get_pr_context(
     base_branch: str,
     head_branch: Optional[str] = None,
     cursor: Optional[str] = None,
     max_diff_tokens: int = 12000,
     repo_path: Optional[str] = None
-) -> str:
+) -> dict:
     """Get diff and commits between branches for PR description.
 
     IMPORTANT: After calling this tool, you should:
@@ -231,72 +381,47 @@ async def get_pr_context(
     Returns:
         JSON string with commits, files, diff chunk, and pagination info
     """
-    try:
-        # Get working directory from MCP roots if repo_path not provided
-        if repo_path is None:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            if roots_result.roots:
-                repo_path = roots_result.roots[0].uri.path
-            else:
-                return json.dumps({'error': 'No repository path provided and no roots available'})
-
-        # Load project config
-        cfg = config_module.load_config(repo_path)
-        pr_cfg = cfg["pr"]
-
-        # Get current branch if head not specified
-        if head_branch is None:
-            head_branch = git_operations.get_current_branch(repo_path)
-
-        # Get commits between branches
-        commits = git_operations.get_branch_commits(repo_path, base_branch, head_branch)
-
-        # Get file stats
-        stats = git_operations.get_branch_file_stats(repo_path, base_branch, head_branch)
-
-        # Get diff between branches
-        diff_output = git_operations.get_branch_diff(repo_path, base_branch, head_branch)
-
-        # Paginate diff by token count
-        paginated = git_operations.paginate_diff(diff_output, cursor, max_diff_tokens)
-
-        # Detect platform
-        platform = git_operations.detect_git_platform(repo_path)
-
-        # Build template instructions with config-aware defaults
-        template_instructions = {
-            'templates_directory': '.devnarrate/pr-templates/',
-            'default_template_available': True,
-            'steps': [
-                '1. Check if .devnarrate/pr-templates/ exists',
-                '2. If yes, list templates and ask user which to use',
-                '3. Read chosen template or use DEFAULT_PR_TEMPLATE',
-                '4. Fill template with analysis of commits and diff'
-            ],
-        }
-        if pr_cfg.get("template"):
-            template_instructions['preferred_template'] = pr_cfg["template"]
-
-        result = {
-            'repository': repo_path,
-            'base_branch': base_branch,
-            'head_branch': head_branch,
-            'platform': platform,
-            'commits': commits,
-            'commit_count': len(commits),
-            'files': stats['files'],
-            'diff': paginated['diff_chunk'],
-            'next_cursor': paginated['next_cursor'],
-            'pagination_info': paginated['chunk_info'],
-            'template_instructions': template_instructions,
-            'draft_by_default': pr_cfg.get("draft_by_default", False),
-        }
-
-        return json.dumps(result, indent=2)
-
-    except Exception as e:
-        return json.dumps({'error': str(e)})
+    # Load project config
+    cfg = config_module.load_config(repo_path)
+    pr_cfg = cfg["pr"]
+
+    # Get current branch if head not specified
+    if head_branch is None:
+        head_branch = await asyncio.to_thread(git_operations.get_current_branch, repo_path)
+
+    # Get commits, file stats and diff between branches, and detect the platform.
+    # The git calls are independent, so run them concurrently off the event loop.
+    commits, stats, diff_output, platform = await asyncio.gather(
+        asyncio.to_thread(git_operations.get_branch_commits, repo_path, base_branch, head_branch),
+        asyncio.to_thread(git_operations.get_branch_file_stats, repo_path, base_branch, head_branch),
+        asyncio.to_thread(git_operations.get_branch_diff, repo_path, base_branch, head_branch),
+        asyncio.to_thread(git_operations.detect_git_platform, repo_path),
+    )
+
+    # Paginate diff by token count
+    paginated = git_operations.paginate_diff(diff_output, cursor, max_diff_tokens)
+
+    # Build template instructions with config-aware defaults
+    template_instructions = _PR_TEMPLATE_INSTRUCTIONS
+    if pr_cfg.get("template"):
+        template_instructions = {**template_instructions, 'preferred_template': pr_cfg["template"]}
+
+    result = {
+        'repository': repo_path,
+        'base_branch': base_branch,
+        'head_branch': head_branch,
+        'platform': platform,
+        'commits': commits,
+        'commit_count': len(commits),
+        'files': stats['files'],
+        'diff': paginated['diff_chunk'],
+        'next_cursor': paginated['next_cursor'],
+        'pagination_info': paginated['chunk_info'],
+        'template_instructions': template_instructions,
+        'draft_by_default': pr_cfg.get("draft_by_default", False),
+    }
+
+    return result
 
 
 @mcp.tool()
@@ -339,15 +464,13 @@ async def create_pr(
         return "Error: user_approved must be True. Show the PR description to the user and get their approval first."
     try:
         # Get working directory from MCP roots if repo_path not provided
+        repo_path = await _resolve_repo_path(repo_path)
         if repo_path is None:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            if roots_result.roots:
-                repo_path = roots_result.roots[0].uri.path
-            else:
-                return "Error: No repository path provided and no roots available"
-
-        result = git_operations.execute_pr_creation(
+            return "Error: No repository path provided and no roots available"
+
+        # The platform CLI makes network calls; keep it off the event loop
+        result = await asyncio.to_thread(
+            git_operations.execute_pr_creation,
             repo_path=repo_path,
             title=title,
             body=body,
@@ -364,11 +487,12 @@ async def create_pr(
 
 
 @mcp.tool()
+@_json_tool
 async def review_changes(
     goal: str,
     scope: str = "working",
     repo_path: Optional[str] = None
-) -> str:
+) -> dict:
     """Review code changes before staging/committing to understand what was done and why.
 
     WHEN TO CALL: After you (the AI assistant) have made code changes on behalf
@@ -437,66 +561,76 @@ async def review_changes(
         - diff: Raw diff text for you to read and understand the code
         - untracked_files: List of new files not yet tracked by git (working scope only)
         - pagination_info: Token counts and chunk info for the diff
+        - diff_truncated: Present when the diff didn't fit; how many lines were left out
     """
-    try:
-        # Get working directory from MCP roots if repo_path not provided
-        if repo_path is None:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            if roots_result.roots:
-                repo_path = roots_result.roots[0].uri.path
-            else:
-                return json.dumps({'error': 'No repository path provided and no roots available'})
-
-        # Load project config
-        cfg = config_module.load_config(repo_path)
-        review_cfg = cfg["review"]
-
-        # Get diff based on scope
-        if scope == "staged":
-            diff_output = git_operations.get_diff(repo_path)
-            stats = git_operations.get_file_stats(repo_path)
-            untracked = []
+    # Load project config
+    cfg = config_module.load_config(repo_path)
+    review_cfg = cfg["review"]
+
+    # Get diff based on scope (independent git calls, run concurrently)
+    if scope == "staged":
+        if await asyncio.to_thread(git_operations.has_staged_changes, repo_path):
+            diff_output, stats = await asyncio.gather(
+                asyncio.to_thread(git_operations.get_diff, repo_path),
+                asyncio.to_thread(git_operations.get_file_stats, repo_path),
+            )
         else:
-            diff_output = git_operations.get_working_diff(repo_path)
-            stats = git_operations.get_working_file_stats(repo_path)
-            untracked = git_operations.get_untracked_files(repo_path)
-
-        has_changes = bool(diff_output.strip()) or bool(untracked)
-
-        if not has_changes:
-            return json.dumps({
-                'goal': goal,
-                'has_changes': False,
-                'message': 'No changes found in the working tree.' if scope == 'working'
-                           else 'No staged changes found.',
-            }, indent=2)
-
-        # Analyze the diff for structured metadata
-        analysis = change_analyzer.analyze_changes(diff_output, stats.get('files', []))
+            diff_output, stats = '', {'files': []}
+        untracked = []
+    else:
+        diff_output, stats = await asyncio.gather(
+            asyncio.to_thread(git_operations.get_working_diff, repo_path),
+            asyncio.to_thread(git_operations.get_working_file_stats, repo_path),
+        )
+        # Untracked files are the 'added' entries of the working tree status
+        untracked = [f['path'] for f in stats['files'] if f['status'] == 'added']
 
-        # Paginate the diff to stay under token limits
-        paginated = git_operations.paginate_diff(diff_output, None)
+    has_changes = (bool(diff_output) and not diff_output.isspace()) or bool(untracked)
 
-        result = {
+    if not has_changes:
+        return {
             'goal': goal,
-            'has_changes': True,
-            'summary': analysis['summary'],
-            'changes': analysis['changes'],
-            'context_clues': analysis['context_clues'],
-            'diff': paginated['diff_chunk'],
-            'next_cursor': paginated['next_cursor'],
-            'pagination_info': paginated['chunk_info'],
-            'large_change_threshold': review_cfg.get("large_change_threshold", 50),
+            'has_changes': False,
+            'message': 'No changes found in the working tree.' if scope == 'working'
+                       else 'No staged changes found.',
         }
 
-        if untracked:
-            result['untracked_files'] = untracked
+    # Analyze the diff for structured metadata
+    analysis = change_analyzer.analyze_changes(diff_output, stats.get('files', []))
+
+    # Paginate the diff to stay under token limits
+    paginated = git_operations.paginate_diff(diff_output, None)
+
+    result = {
+        'goal': goal,
+        'has_changes': True,
+        'summary': analysis['summary'],
+        'changes': analysis['changes'],
+        'context_clues': analysis['context_clues'],
+        'diff': paginated['diff_chunk'],
+        'next_cursor': paginated['next_cursor'],
+        'pagination_info': paginated['chunk_info'],
+        'large_change_threshold': review_cfg.get("large_change_threshold", 50),
+    }
+
+    # Only the first page of the diff fits in the response; tell the model what's
+    # missing. The summary, changes and context clues still cover the full diff.
+    if paginated['next_cursor'] is not None:
+        chunk_info = paginated['chunk_info']
+        omitted_lines = chunk_info['total_lines'] - chunk_info['end_line']
+        result['diff_truncated'] = {
+            'omitted_lines': omitted_lines,
+            'message': (
+                f'Diff truncated to fit the response budget: the last {omitted_lines} '
+                f'of {chunk_info["total_lines"]} lines are not included. Summary, '
+                'changes and context_clues cover the full diff.'
+            ),
+        }
 
-        return json.dumps(result, indent=2)
+    if untracked:
+        result['untracked_files'] = untracked
 
-    except Exception as e:
-        return json.dumps({'error': str(e)})
+    return result
 
 
 if __name__ == "__main__":
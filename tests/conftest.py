@@ -1,36 +1,48 @@
 """Shared test fixtures for DevNarrate tests."""
 
+import shutil
 import subprocess
 from pathlib import Path
 
 import pytest
 
 
-@pytest.fixture
-def tmp_git_repo(tmp_path: Path) -> Path:
-    """Create a temporary git repository with an initial commit.
-
-    Returns the path to the repo root.
-    """
+@pytest.fixture(scope="session")
+def _git_repo_template(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Create a git repository with an initial commit once per test session."""
+    template = tmp_path_factory.mktemp("git_repo_template")
     subprocess.run(
-        ["git", "init"], cwd=tmp_path, capture_output=True, check=True
+        ["git", "init"], cwd=template, capture_output=True, check=True
     )
     subprocess.run(
         ["git", "config", "user.email", "test@devnarrate.test"],
-        cwd=tmp_path, capture_output=True, check=True,
+        cwd=template, capture_output=True, check=True,
     )
     subprocess.run(
         ["git", "config", "user.name", "Test User"],
-        cwd=tmp_path, capture_output=True, check=True,
+        cwd=template, capture_output=True, check=True,
     )
     # Create an initial commit so we have a valid HEAD
-    initial_file = tmp_path / "README.md"
+    initial_file = template / "README.md"
     initial_file.write_text("# Test Repo\n")
     subprocess.run(
-        ["git", "add", "README.md"], cwd=tmp_path, capture_output=True, check=True
+        ["git", "add", "README.md"], cwd=template, capture_output=True, check=True
     )
     subprocess.run(
         ["git", "commit", "-m", "initial commit"],
-        cwd=tmp_path, capture_output=True, check=True,
+        cwd=template, capture_output=True, check=True,
     )
+    return template
+
+
+@pytest.fixture
+def tmp_git_repo(tmp_path: Path, _git_repo_template: Path) -> Path:
+    """Create a temporary git repository with an initial commit.
+
+    The repository is copied from a session-wide template, which is much
+    cheaper than running git init/config/add/commit for every test.
+
+    Returns the path to the repo root.
+    """
+    shutil.copytree(_git_repo_template, tmp_path, dirs_exist_ok=True)
     return tmp_path
@@ -48,6 +48,18 @@ new file mode 100644
 +    return True
 """
 
+# A secret that is only removed: it lives in a - line and must not be reported
+DIFF_MODIFIED_REMOVES_SECRET = (
+    "diff --git a/config.py b/config.py\n"
+    "index 3b18e51..a5c1f9d 100644\n"
+    "--- a/config.py\n"
+    "+++ b/config.py\n"
+    "@@ -1 +1,2 @@\n"
+    f'-OLD_SECRET = "{_SK}oldkey123456789012345"\n'
+    "+DEBUG = True\n"
+    '+LOG_LEVEL = "info"\n'
+)
+
 DIFF_WITH_SUPPRESSED_SECRET = """\
 diff --git a/config.py b/config.py
 new file mode 100644
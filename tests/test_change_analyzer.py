@@ -1,5 +1,10 @@
 """Tests for the change_analyzer module."""
 
+from dataclasses import FrozenInstanceError, asdict
+
+import pytest
+
+from devnarrate import change_analyzer
 from devnarrate.change_analyzer import (
     ChangedFile,
     ContextClue,
@@ -169,6 +174,13 @@ class TestParseDiffStats:
         result = parse_diff_stats("   \n\n  ")
         assert result == []
 
+    def test_results_are_slotted_and_immutable(self):
+        changed = parse_diff_stats(DIFF_NEW_FILE)[0]
+        assert not hasattr(changed, "__dict__")
+        with pytest.raises(FrozenInstanceError):
+            changed.status = "modified"
+        assert len({changed, parse_diff_stats(DIFF_NEW_FILE)[0]}) == 1
+
 
 class TestExtractContextClues:
     """Tests for extract_context_clues."""
@@ -239,6 +251,98 @@ index 0000000..abc1234
         assert len(result[0].comments) == 1
         assert "meaningful comment" in result[0].comments[0]
 
+    def test_noise_filter_is_case_insensitive(self):
+        diff = """\
+diff --git a/noise.py b/noise.py
+new file mode 100644
+index 0000000..abc1234
+--- /dev/null
++++ b/noise.py
+@@ -0,0 +1,3 @@
++# NOQA: E501 applies to the whole block below
++# Type: Ignore the missing stub for this import
++# Pragma once equivalent for this module
+"""
+        assert extract_context_clues(diff) == []
+
+    def test_formatter_directives_filtered(self):
+        diff = """\
+diff --git a/table.py b/table.py
+new file mode 100644
+index 0000000..abc1234
+--- /dev/null
++++ b/table.py
+@@ -0,0 +1,3 @@
++# fmt: off
++# type:ignore[assignment] is needed for the legacy stub
++# fmt: on
+"""
+        assert extract_context_clues(diff) == []
+
+    def test_comments_and_docstrings_interleaved(self):
+        diff = """\
+diff --git a/mixed.py b/mixed.py
+new file mode 100644
+index 0000000..abc1234
+--- /dev/null
++++ b/mixed.py
+@@ -0,0 +1,8 @@
++# Retry policy for flaky uploads
++def upload():
++    \"\"\"Upload with exponential backoff.
++    Gives up after five attempts.
++    \"\"\"
++    # Backoff doubles each attempt
++\"\"\"Unterminated docstring
++still collected at end of diff
+"""
+        result = extract_context_clues(diff)
+        assert len(result) == 1
+        assert result[0].comments == [
+            "Retry policy for flaky uploads",
+            "Backoff doubles each attempt",
+        ]
+        assert result[0].docstrings == [
+            "Upload with exponential backoff. Gives up after five attempts.",
+            "Unterminated docstring still collected at end of diff",
+        ]
+
+    def test_comment_syntax_follows_file_extension(self):
+        """Known languages only recognize their own comment syntax."""
+        diff = """\
+diff --git a/counter.js b/counter.js
+new file mode 100644
+index 0000000..abc1234
+--- /dev/null
++++ b/counter.js
+@@ -0,0 +1,2 @@
++#count = 0 in a private class field
++// Counter shared across widgets
+diff --git a/notes.txt b/notes.txt
+new file mode 100644
+index 0000000..abc1234
+--- /dev/null
++++ b/notes.txt
+@@ -0,0 +1,2 @@
++# Unknown file types accept any syntax
++// including slashes
+"""
+        result = {c.file: c.comments for c in extract_context_clues(diff)}
+        assert result["counter.js"] == ["Counter shared across widgets"]
+        assert result["notes.txt"] == [
+            "Unknown file types accept any syntax",
+            "including slashes",
+        ]
+
+    def test_line_classifier_kinds(self):
+        classify = change_analyzer._LINE_CLASSIFIER.match
+        assert classify("  # comment").lastgroup == "comment"
+        assert classify("-- sql comment").lastgroup == "comment"
+        assert classify('    """Docstring"""').lastgroup == "py_open"
+        assert classify("'''").lastgroup == "py_open"
+        assert classify(" /** JSDoc").lastgroup == "js_open"
+        assert classify("x = 1  # trailing") is None
+
 
 class TestAnalyzeChanges:
     """Tests for the analyze_changes orchestrator."""
@@ -254,6 +358,16 @@ class TestAnalyzeChanges:
         assert result['summary']['files_added'] == 1
         assert result['summary']['files_modified'] == 1
 
+    def test_summary_counts_by_status(self):
+        result = analyze_changes(DIFF_NEW_FILE + DIFF_DELETED_FILE, [])
+        summary = result['summary']
+        assert summary['files_added'] == 1
+        assert summary['files_deleted'] == 1
+        assert summary['files_modified'] == 0
+        assert summary['files_renamed'] == 0
+        assert summary['total_lines_added'] == 5
+        assert summary['total_lines_removed'] == 3
+
     def test_empty_diff(self):
         result = analyze_changes("", [])
         assert result['summary']['total_files'] == 0
@@ -271,6 +385,14 @@ class TestAnalyzeChanges:
         assert result['summary']['files_added'] == 2
         assert len(result['changes']) == 2
 
+    def test_untracked_only_skips_diff_parsing(self, monkeypatch):
+        change_analyzer._analyze_changes_cached.cache_clear()
+        monkeypatch.setattr(change_analyzer, "_analyze_file_section", None)
+        file_stats = [{'path': 'only_untracked.py', 'status': 'added'}]
+        result = analyze_changes("", file_stats)
+        assert result['summary']['files_added'] == 1
+        assert result['context_clues'] == []
+
     def test_untracked_not_double_counted(self):
         """Files in both diff and file_stats shouldn't be counted twice."""
         file_stats = [
@@ -281,6 +403,65 @@ class TestAnalyzeChanges:
         # 2 from diff + 1 extra from file_stats = 3
         assert result['summary']['total_files'] == 3
 
+    def test_diff_parsed_once(self, monkeypatch):
+        """Stats and context clues share a single PatchSet parse per file."""
+        calls = []
+        real_patchset = change_analyzer.PatchSet
+
+        def counting_patchset(diff_text):
+            calls.append(diff_text)
+            return real_patchset(diff_text)
+
+        monkeypatch.setattr(change_analyzer, "PatchSet", counting_patchset)
+        change_analyzer._analyze_changes_cached.cache_clear()
+        change_analyzer._analyze_file_section.cache_clear()
+        result = analyze_changes(DIFF_MULTI_FILE, [])
+        assert len(calls) == 2
+        assert "".join(calls) == DIFF_MULTI_FILE
+        assert result['summary']['total_files'] == 2
+        assert len(result['context_clues']) == 2
+
+    def test_only_changed_file_reparsed(self, monkeypatch):
+        calls = []
+        real_patchset = change_analyzer.PatchSet
+
+        def counting_patchset(diff_text):
+            calls.append(diff_text)
+            return real_patchset(diff_text)
+
+        change_analyzer._analyze_changes_cached.cache_clear()
+        change_analyzer._analyze_file_section.cache_clear()
+        analyze_changes(DIFF_MULTI_FILE, [])
+        monkeypatch.setattr(change_analyzer, "PatchSet", counting_patchset)
+        edited = DIFF_MULTI_FILE.replace("JWT_EXPIRY = 3600", "JWT_EXPIRY = 7200")
+        result = analyze_changes(edited, [])
+        assert len(calls) == 1
+        assert calls[0].startswith("diff --git a/config.py")
+        assert result['summary']['total_files'] == 2
+
+    def test_serialized_fields_match_dataclasses(self):
+        """Hand-built dicts must stay in sync with the dataclass fields."""
+        result = analyze_changes(DIFF_MULTI_FILE, [])
+        assert result['changes'] == [asdict(f) for f in parse_diff_stats(DIFF_MULTI_FILE)]
+        assert result['context_clues'] == [
+            asdict(c) for c in extract_context_clues(DIFF_MULTI_FILE)
+        ]
+
+    def test_repeat_analysis_served_from_cache(self, monkeypatch):
+        change_analyzer._analyze_changes_cached.cache_clear()
+        first = analyze_changes(DIFF_MULTI_FILE, [])
+        monkeypatch.setattr(change_analyzer, "PatchSet", None)  # would fail if re-parsed
+        second = analyze_changes(DIFF_MULTI_FILE, [])
+        assert second == first
+
+    def test_cached_result_not_shared_with_caller(self):
+        first = analyze_changes(DIFF_MULTI_FILE, [])
+        first['changes'].clear()
+        first['summary']['total_files'] = 0
+        second = analyze_changes(DIFF_MULTI_FILE, [])
+        assert len(second['changes']) == 2
+        assert second['summary']['total_files'] == 2
+
     def test_output_is_serializable(self):
         """Output should be JSON-serializable (no dataclass objects)."""
         import json
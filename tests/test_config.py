@@ -2,6 +2,7 @@
 
 import json
 import os
+import re
 import subprocess
 import textwrap
 
@@ -120,6 +121,24 @@ class TestLoadConfig:
         assert cfg["secrets"]["enabled"] is False
         assert cfg["secrets"]["max_findings"] == 5
 
+    def test_scanner_skip_paths_default_from_config(self, tmp_path):
+        from devnarrate.secret_scanner import DEFAULT_SKIP_PATHS
+
+        cfg = load_config(str(tmp_path))
+        assert tuple(cfg["secrets"]["skip_paths"]) == DEFAULT_SKIP_PATHS
+
+    def test_skip_paths_can_be_disabled(self, tmp_path):
+        config_dir = tmp_path / ".devnarrate"
+        config_dir.mkdir()
+        config_file = config_dir / "config.toml"
+        config_file.write_text(textwrap.dedent("""\
+            [secrets]
+            skip_paths = []
+        """))
+
+        cfg = load_config(str(tmp_path))
+        assert cfg["secrets"]["skip_paths"] == []
+
     def test_custom_secret_patterns(self, tmp_path):
         config_dir = tmp_path / ".devnarrate"
         config_dir.mkdir()
@@ -391,6 +410,70 @@ class TestCustomSecretPatterns:
         )
         assert result["status"] == "clean"
 
+    def test_first_listed_pattern_names_finding(self):
+        from devnarrate.secret_scanner import scan_diff
+
+        diff = (
+            "diff --git a/app.py b/app.py\n"
+            "--- a/app.py\n"
+            "+++ b/app.py\n"
+            "@@ -0,0 +1 @@\n"
+            "+x = 'zzz MYCO-1'\n"
+        )
+
+        result = scan_diff(
+            diff,
+            custom_patterns=[
+                {"name": "Later In Line", "pattern": r"MYCO-\d"},
+                {"name": "Earlier In Line", "pattern": r"zzz"},
+            ],
+        )
+        assert [f["type"] for f in result["findings"]] == ["Later In Line"]
+
+    def test_patterns_that_cannot_be_combined_still_match(self):
+        from devnarrate.secret_scanner import _compile_union, scan_diff
+
+        diff = (
+            "diff --git a/app.py b/app.py\n"
+            "--- a/app.py\n"
+            "+++ b/app.py\n"
+            "@@ -0,0 +1,2 @@\n"
+            "+pin = 'abab'\n"
+            "+KEY = 'secret-SVC'\n"
+        )
+        patterns = [
+            {"name": "Repeated Pair", "pattern": r"(ab)\1"},
+            {"name": "Service Key", "pattern": r"(?i)secret-svc"},
+        ]
+        assert _compile_union(re.compile(p["pattern"]) for p in patterns[:1]) is None
+
+        result = scan_diff(diff, custom_patterns=patterns)
+        assert {(f["line"], f["type"]) for f in result["findings"]} >= {
+            (1, "Repeated Pair"),
+            (2, "Service Key"),
+        }
+
+    def test_conditional_group_patterns_not_combined(self):
+        from devnarrate.secret_scanner import _compile_union, scan_diff
+
+        diff = (
+            "diff --git a/app.py b/app.py\n"
+            "--- a/app.py\n"
+            "+++ b/app.py\n"
+            "@@ -0,0 +1 @@\n"
+            "+code = 'ab'\n"
+        )
+        # Combined, (?(1)...) would test the first pattern's group instead
+        patterns = [
+            {"name": "Marker", "pattern": r"(zz)q"},
+            {"name": "Conditional", "pattern": r"(a)?(?(1)b|c)"},
+        ]
+        assert _compile_union(re.compile(p["pattern"]) for p in patterns[1:]) is None
+        assert _compile_union([re.compile(r"(?P<x>a)(?P=x)")]) is None
+
+        result = scan_diff(diff, custom_patterns=patterns)
+        assert [(f["line"], f["type"]) for f in result["findings"]] == [(1, "Conditional")]
+
     def test_max_findings_override(self):
         from devnarrate.secret_scanner import scan_diff
 
@@ -410,3 +493,21 @@ class TestCustomSecretPatterns:
         result = scan_diff(diff, max_findings=2)
         if result["total_findings"] > 2:
             assert len(result["findings"]) == 2
+
+    def test_patterns_compiled_once_across_diffs(self):
+        from devnarrate import secret_scanner
+
+        patterns = [{"name": "Internal Token", "pattern": r"itk_[a-z0-9]{8}"}]
+        secret_scanner._compile_custom_patterns.cache_clear()
+        for value in ("itk_aaaa1111", "itk_bbbb2222"):
+            diff = (
+                "diff --git a/app.py b/app.py\n"
+                "--- a/app.py\n"
+                "+++ b/app.py\n"
+                "@@ -0,0 +1 @@\n"
+                f"+TOKEN = '{value}'\n"
+            )
+            result = secret_scanner.scan_diff(diff, custom_patterns=patterns)
+            assert any(f["type"] == "Internal Token" for f in result["findings"])
+        info = secret_scanner._compile_custom_patterns.cache_info()
+        assert (info.misses, info.hits) == (1, 1)
@@ -13,6 +13,7 @@ import subprocess
 
 import pytest
 
+from devnarrate import git_operations
 from devnarrate.git_operations import (
     count_tokens,
     detect_git_platform,
@@ -23,6 +24,9 @@ from devnarrate.git_operations import (
     get_current_branch,
     get_diff,
     get_file_stats,
+    get_untracked_files,
+    get_working_file_stats,
+    has_staged_changes,
     paginate_diff,
 )
 
@@ -53,6 +57,23 @@ class TestCountTokens:
         tokens = count_tokens(code)
         assert tokens > 0
 
+    def test_encoding_loaded_once(self, monkeypatch):
+        calls = []
+        real_get_encoding = git_operations.tiktoken.get_encoding
+
+        def counting_get_encoding(name):
+            calls.append(name)
+            return real_get_encoding(name)
+
+        monkeypatch.setattr(git_operations.tiktoken, "get_encoding", counting_get_encoding)
+        git_operations._get_encoding.cache_clear()
+        try:
+            for _ in range(5):
+                count_tokens("hello world")
+        finally:
+            git_operations._get_encoding.cache_clear()
+        assert calls == ["cl100k_base"]
+
 
 # ──────────────────────────────────
 # Tests for paginate_diff()
@@ -95,6 +116,135 @@ class TestPaginateDiff:
         page2 = paginate_diff(diff, page1["next_cursor"], max_tokens=50)
         assert page2["chunk_info"]["start_line"] == int(page1["next_cursor"])
 
+    def test_chunk_tokens_stay_within_budget(self):
+        lines = [f"+variable_{i} = 'value_{i}'" for i in range(200)]
+        diff = "\n".join(lines)
+        result = paginate_diff(diff, None, max_tokens=50)
+        assert 0 < result["chunk_info"]["chunk_tokens"] <= 50
+
+    def test_pages_cover_every_line(self):
+        lines = [f"line_{i}" for i in range(100)]
+        diff = "\n".join(lines)
+        collected = []
+        cursor = None
+        while True:
+            page = paginate_diff(diff, cursor, max_tokens=50)
+            collected.extend(page["diff_chunk"].split("\n"))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert collected == lines
+
+    def test_pages_rejoin_to_original_text(self):
+        diff = "".join(f"+variable_{i} = 'value_{i}'\n" for i in range(200))
+        chunks = []
+        cursor = None
+        while True:
+            page = paginate_diff(diff, cursor, max_tokens=50)
+            chunks.append(page["diff_chunk"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(chunks) > 1
+        assert "\n".join(chunks) == diff
+
+    def test_line_offsets_match_split(self):
+        for diff in ("a", "a\nbb\n", "\n\nccc\n\n", "x\ny"):
+            line_starts = git_operations._index_diff(diff)[0]
+            lines = diff.split("\n")
+            assert len(line_starts) == len(lines) + 1
+            assert [diff[line_starts[i]:line_starts[i + 1] - 1] for i in range(len(lines))] == lines
+
+    def test_later_pages_reuse_token_counts(self, monkeypatch):
+        lines = [f"line_{i}" for i in range(100)]
+        diff = "\n".join(lines)
+        page1 = paginate_diff(diff, None, max_tokens=50)
+        counted = []
+        real_count_tokens = git_operations.count_tokens
+
+        def recording_count_tokens(text):
+            counted.append(text)
+            return real_count_tokens(text)
+
+        monkeypatch.setattr(git_operations, "count_tokens", recording_count_tokens)
+        page2 = paginate_diff(diff, page1["next_cursor"], max_tokens=50)
+        assert page2["chunk_info"]["total_tokens"] == page1["chunk_info"]["total_tokens"]
+        # Only the chunk itself is encoded, never the whole diff again
+        assert diff not in counted
+
+    def test_large_diff_total_extrapolated_from_prefix(self, monkeypatch):
+        monkeypatch.setattr(git_operations, "TOKEN_SAMPLE_CHARS", 1000)
+        diff = "".join(f"+estimated_{i} = {i}\n" for i in range(2000))
+        counted = []
+        real_count_tokens = git_operations.count_tokens
+
+        def recording_count_tokens(text):
+            counted.append(len(text))
+            return real_count_tokens(text)
+
+        monkeypatch.setattr(git_operations, "count_tokens", recording_count_tokens)
+        info = paginate_diff(diff, None, max_tokens=200)["chunk_info"]
+        assert info["total_tokens_estimated"] is True
+        assert max(counted) < len(diff)
+        assert info["total_tokens"] == pytest.approx(real_count_tokens(diff), rel=0.1)
+        assert info["chunk_tokens"] <= 200
+
+    def test_small_diff_total_is_exact(self):
+        diff = "line1\nline2\n"
+        info = paginate_diff(diff, None)["chunk_info"]
+        assert info["total_tokens"] == count_tokens(diff)
+        assert "total_tokens_estimated" not in info
+
+    def test_dense_chunk_shrinks_to_budget(self, monkeypatch):
+        # Second half of the diff costs far more tokens per character than the first
+        lines = ["a" * 40] * 50 + ["X" * 40] * 50
+        diff = "\n".join(lines)
+        monkeypatch.setattr(
+            git_operations, "count_tokens", lambda text: len(text) // 40 + text.count("X")
+        )
+        cursor = None
+        seen = []
+        while True:
+            page = paginate_diff(diff, cursor, max_tokens=200)
+            info = page["chunk_info"]
+            if info["end_line"] - info["start_line"] > 1:
+                assert info["chunk_tokens"] <= 200
+            seen.extend(page["diff_chunk"].split("\n"))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == lines
+
+    def test_diff_within_budget_is_one_page(self):
+        lines = [f"+item_{i} = compute({i}, 'x' * {i})" for i in range(101)]
+        diff = "\n".join(lines)
+        total_tokens = paginate_diff(diff, None)["chunk_info"]["total_tokens"]
+        result = paginate_diff(diff, None, max_tokens=total_tokens)
+        assert result["next_cursor"] is None
+        assert result["diff_chunk"] == diff
+        assert result["chunk_info"]["end_line"] == result["chunk_info"]["total_lines"]
+        assert result["chunk_info"]["chunk_tokens"] == total_tokens
+
+    def test_remainder_within_budget_is_last_page(self):
+        lines = [f"+item_{i} = compute({i})" for i in range(100)]
+        diff = "\n".join(lines)
+        remainder = "\n".join(lines[60:])
+        result = paginate_diff(diff, "60", max_tokens=count_tokens(remainder))
+        assert result["next_cursor"] is None
+        assert result["diff_chunk"] == remainder
+
+    def test_sparse_chunk_grows_to_budget(self, monkeypatch):
+        # First half of the diff costs far fewer tokens per character than the second
+        lines = ["a" * 40] * 50 + ["X" * 40] * 50
+        diff = "\n".join(lines)
+        monkeypatch.setattr(
+            git_operations, "count_tokens", lambda text: len(text) // 40 + text.count("X")
+        )
+        info = paginate_diff(diff, None, max_tokens=60)["chunk_info"]
+        assert info["chunk_tokens"] <= 60
+        # The average-density estimate alone stops after only a few lines
+        assert info["end_line"] >= 40
+
     def test_invalid_cursor_starts_from_zero(self):
         result = paginate_diff("line1\nline2", "invalid", max_tokens=1000)
         assert result["chunk_info"]["start_line"] == 0
@@ -159,6 +309,32 @@ class TestGetDiff:
         assert "+x = 1" in diff
         assert "+y = 2" in diff
 
+    def test_non_utf8_content_is_replaced(self, tmp_git_repo):
+        """Undecodable bytes in a staged file don't make the diff fail."""
+        f = tmp_git_repo / "latin1.txt"
+        f.write_bytes(b"caf\xe9\n")
+        subprocess.run(
+            ["git", "add", "latin1.txt"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        diff = get_diff(str(tmp_git_repo))
+        assert "+caf�" in diff
+
+    def test_has_staged_changes(self, tmp_git_repo):
+        """The exit-code probe agrees with the staged diff."""
+        assert has_staged_changes(str(tmp_git_repo)) is False
+        (tmp_git_repo / "README.md").write_text("# Modified but not staged\n")
+        assert has_staged_changes(str(tmp_git_repo)) is False
+        subprocess.run(
+            ["git", "add", "README.md"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        assert has_staged_changes(str(tmp_git_repo)) is True
+
+    def test_has_staged_changes_outside_repo_raises(self, tmp_path):
+        with pytest.raises(subprocess.CalledProcessError):
+            has_staged_changes(str(tmp_path))
+
 
 # ──────────────────────────────────
 # Tests for get_file_stats()
@@ -214,6 +390,54 @@ class TestGetFileStats:
         paths = {f["path"] for f in stats["files"]}
         assert "unstaged.py" not in paths
 
+    def test_unstaged_modification_listed_first_not_staged(self, tmp_git_repo):
+        """A leading unstaged entry keeps its blank index status."""
+        (tmp_git_repo / "README.md").write_text("# Modified but not staged\n")
+        (tmp_git_repo / "zz.py").write_text("z = 1\n")
+        subprocess.run(
+            ["git", "add", "zz.py"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        stats = get_file_stats(str(tmp_git_repo))
+        assert stats["files"] == [{"path": "zz.py", "status": "added"}]
+
+    def test_renamed_file_reports_new_path(self, tmp_git_repo):
+        subprocess.run(
+            ["git", "mv", "README.md", "GUIDE.md"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        stats = get_file_stats(str(tmp_git_repo))
+        assert stats["files"] == [{"path": "GUIDE.md", "status": "renamed"}]
+
+    def test_paths_with_spaces_and_unicode_unquoted(self, tmp_git_repo):
+        f = tmp_git_repo / "my notes é.txt"
+        f.write_text("hi\n")
+        subprocess.run(
+            ["git", "add", "my notes é.txt"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        stats = get_file_stats(str(tmp_git_repo))
+        assert stats["files"] == [{"path": "my notes é.txt", "status": "added"}]
+
+
+# ──────────────────────────────────
+# Tests for get_working_file_stats()
+# ──────────────────────────────────
+
+
+class TestGetWorkingFileStats:
+    """Tests for working tree status parsing."""
+
+    def test_untracked_files_listed_individually(self, tmp_git_repo):
+        pkg = tmp_git_repo / "pkg"
+        pkg.mkdir()
+        (pkg / "a.py").write_text("a = 1\n")
+        (pkg / "b.py").write_text("b = 2\n")
+        stats = get_working_file_stats(str(tmp_git_repo))
+        added = sorted(f["path"] for f in stats["files"] if f["status"] == "added")
+        assert added == ["pkg/a.py", "pkg/b.py"]
+        assert added == sorted(get_untracked_files(str(tmp_git_repo)))
+
 
 # ──────────────────────────────────
 # Tests for execute_commit()
@@ -277,6 +501,24 @@ class TestBranchOperations:
         branch = get_current_branch(str(tmp_git_repo))
         assert branch == "feature/test"
 
+    def test_current_branch_cached_until_checkout(self, tmp_git_repo, monkeypatch):
+        repo = str(tmp_git_repo)
+        first = get_current_branch(repo)
+        real_run = subprocess.run
+        calls = []
+
+        def counting_run(args, **kwargs):
+            calls.append(args)
+            return real_run(args, **kwargs)
+
+        monkeypatch.setattr(git_operations.subprocess, "run", counting_run)
+        assert get_current_branch(repo) == first
+        assert calls == []
+
+        real_run(["git", "checkout", "-b", "feature/cached"], cwd=repo, capture_output=True, check=True)
+        assert get_current_branch(repo) == "feature/cached"
+        assert len(calls) == 1
+
     def test_branch_diff(self, tmp_git_repo):
         """Branch diff shows changes between main and feature branch."""
         main_branch = get_current_branch(str(tmp_git_repo))
@@ -391,3 +633,23 @@ class TestDetectGitPlatform:
             cwd=tmp_git_repo, capture_output=True, check=True,
         )
         assert detect_git_platform(str(tmp_git_repo)) == "unknown"
+
+    def test_platform_cached_until_remote_changes(self, tmp_git_repo, monkeypatch):
+        repo = str(tmp_git_repo)
+        assert detect_git_platform(repo) == "unknown"
+        real_run = subprocess.run
+        calls = []
+
+        def counting_run(args, **kwargs):
+            calls.append(args)
+            return real_run(args, **kwargs)
+
+        monkeypatch.setattr(git_operations.subprocess, "run", counting_run)
+        assert detect_git_platform(repo) == "unknown"
+        assert calls == []
+
+        real_run(
+            ["git", "remote", "add", "origin", "git@github.com:user/repo.git"],
+            cwd=repo, capture_output=True, check=True,
+        )
+        assert detect_git_platform(repo) == "github"
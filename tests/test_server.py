@@ -5,6 +5,7 @@ These tests verify the MCP tools end-to-end:
 - commit_changes requires user_approved=True
 - get_pr_context returns correct branch info
 - create_pr requires user_approved=True
+- MCP roots are resolved once per session when the client reports changes
 """
 
 import json
@@ -12,6 +13,7 @@ import subprocess
 
 import pytest
 
+from mcp.server.session import ServerSession
 from mcp.shared.memory import (
     create_connected_server_and_client_session as create_session,
 )
@@ -48,6 +50,26 @@ class TestGetCommitContext:
             data = json.loads(result.content[0].text)
             assert data["has_changes"] is False
 
+    @pytest.mark.asyncio
+    async def test_no_staged_changes_skips_diff(self, tmp_git_repo, monkeypatch):
+        """An empty staging area is detected without capturing the diff."""
+        from devnarrate import git_operations
+
+        def fail(repo_path):
+            raise AssertionError("diff should not be captured")
+
+        monkeypatch.setattr(git_operations, "get_diff", fail)
+        monkeypatch.setattr(git_operations, "get_file_stats", fail)
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=_roots_callback(str(tmp_git_repo)),
+        ) as client:
+            result = await client.call_tool("get_commit_context", {})
+            data = json.loads(result.content[0].text)
+            assert data["has_changes"] is False
+            assert data["files"] == []
+            assert data["secret_scan"]["status"] == "clean"
+
     @pytest.mark.asyncio
     async def test_staged_file_returns_diff(self, tmp_git_repo):
         """Staged file appears in the diff output."""
@@ -121,6 +143,29 @@ class TestGetCommitContext:
             assert "commit_format_guide" in data
             assert "types" in data["commit_format_guide"]
 
+    @pytest.mark.asyncio
+    async def test_commit_format_guide_reused_across_calls(self, tmp_git_repo):
+        """The guide is built once per config and shared read-only."""
+        from devnarrate import server
+
+        f = tmp_git_repo / "test.py"
+        f.write_text("pass\n")
+        subprocess.run(
+            ["git", "add", "test.py"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        server._commit_format_guide.cache_clear()
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=_roots_callback(str(tmp_git_repo)),
+        ) as client:
+            first = await client.call_tool("get_commit_context", {})
+            second = await client.call_tool("get_commit_context", {})
+        assert server._commit_format_guide.cache_info().hits == 1
+        guide = json.loads(second.content[0].text)["commit_format_guide"]
+        assert guide == json.loads(first.content[0].text)["commit_format_guide"]
+        assert isinstance(guide["types"], list)
+
     @pytest.mark.asyncio
     async def test_pagination_cursor_skips_secret_scan(self, tmp_git_repo):
         """When a cursor is provided, secret scan is skipped (only first page)."""
@@ -141,6 +186,25 @@ class TestGetCommitContext:
             # Secret scan should indicate it was skipped
             assert "first page" in data["secret_scan"]["message"].lower()
 
+    @pytest.mark.asyncio
+    async def test_response_is_compact_json(self, tmp_git_repo):
+        """Responses carry no indentation and keep non-ASCII text unescaped."""
+        f = tmp_git_repo / "menu.txt"
+        f.write_text("café\n")
+        subprocess.run(
+            ["git", "add", "menu.txt"],
+            cwd=tmp_git_repo, capture_output=True, check=True,
+        )
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=_roots_callback(str(tmp_git_repo)),
+        ) as client:
+            result = await client.call_tool("get_commit_context", {})
+            text = result.content[0].text
+            assert '\n  "' not in text
+            assert "+café" in text
+            assert json.loads(text)["has_changes"] is True
+
 
 # ──────────────────────────────────
 # Tests for commit_changes
@@ -226,6 +290,8 @@ class TestGetPrContext:
             assert data["base_branch"] == main_branch
             assert data["commit_count"] >= 1
             assert "pr_file.py" in data["diff"]
+            assert len(data["template_instructions"]["steps"]) == 4
+            assert "preferred_template" not in data["template_instructions"]
 
 
 # ──────────────────────────────────
@@ -362,6 +428,26 @@ class TestReviewChanges:
             assert "context_clues" in data
             assert "diff" in data
             assert "pagination_info" in data
+            assert "diff_truncated" not in data
+
+    @pytest.mark.asyncio
+    async def test_large_diff_reports_truncation(self, tmp_git_repo):
+        """A diff over the response budget is flagged, while stats cover every line."""
+        readme = tmp_git_repo / "README.md"
+        readme.write_text("".join(f"line {i}: " + "lorem ipsum " * 8 + "\n" for i in range(2000)))
+
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=_roots_callback(str(tmp_git_repo)),
+        ) as client:
+            result = await client.call_tool(
+                "review_changes", {"goal": "test truncation"}
+            )
+            data = json.loads(result.content[0].text)
+            truncated = data["diff_truncated"]
+            info = data["pagination_info"]
+            assert truncated["omitted_lines"] == info["total_lines"] - info["end_line"] > 0
+            assert data["summary"]["total_lines_added"] == 2000
 
 
 # ──────────────────────────────────
@@ -390,3 +476,69 @@ class TestCreatePr:
             )
             text = result.content[0].text
             assert "Error" in text or "user_approved" in text
+
+
+# ──────────────────────────────────
+# Tests for MCP roots resolution
+# ──────────────────────────────────
+
+
+class TestRootsResolution:
+    """The client's roots are requested once per session and refreshed on change."""
+
+    @staticmethod
+    def _counting_roots_callback(repo_path: str, calls: list):
+        inner = _roots_callback(repo_path)
+
+        async def list_roots(context) -> ListRootsResult:
+            calls.append(context)
+            return await inner(context)
+        return list_roots
+
+    @pytest.mark.asyncio
+    async def test_roots_requested_once_per_session(self, tmp_git_repo):
+        calls = []
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=self._counting_roots_callback(str(tmp_git_repo), calls),
+        ) as client:
+            for _ in range(3):
+                result = await client.call_tool("get_commit_context", {})
+                data = json.loads(result.content[0].text)
+                assert data["repository"] == str(tmp_git_repo)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_roots_refreshed_after_list_changed(self, tmp_git_repo):
+        calls = []
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=self._counting_roots_callback(str(tmp_git_repo), calls),
+        ) as client:
+            await client.call_tool("get_commit_context", {})
+            await client.send_roots_list_changed()
+            await client.call_tool("get_commit_context", {})
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_roots_not_cached_without_list_changed_capability(
+        self, tmp_git_repo, monkeypatch
+    ):
+        real_check = ServerSession.check_client_capability
+
+        def without_roots_list_changed(session, capability):
+            if capability.roots is not None and capability.roots.listChanged:
+                return False
+            return real_check(session, capability)
+
+        monkeypatch.setattr(
+            ServerSession, "check_client_capability", without_roots_list_changed
+        )
+        calls = []
+        async with create_session(
+            devnarrate_mcp,
+            list_roots_callback=self._counting_roots_callback(str(tmp_git_repo), calls),
+        ) as client:
+            for _ in range(2):
+                await client.call_tool("get_commit_context", {})
+        assert len(calls) == 2